@@ -0,0 +1,619 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import functools
+from itertools import islice
+import sqlite3
+
+from genderify.fetch import AsyncFetcher, FetchError
+from genderify.gender_finder import (
+    Artist,
+    BATCH_CHUNK_SIZE,
+    BatchProgress,
+    Genderifier,
+    IMPORT_CHUNK_SIZE,
+    PLAYLIST_SNAPSHOT_FIELDS,
+    SEARCH_PAGES_AHEAD,
+    SPOTIFY_SEARCH_URL,
+    WIKI_API_MAX_TITLES,
+    WikiTitle,
+)
+from genderify.parsing import WikiStreamWatcher
+from genderify.schema import SEARCH_CHECKPOINT, normalize_name
+
+
+class AsyncGenderifier(Genderifier):
+    """Genderifier for asyncio, to keep thousands of lookups in flight.
+
+    Use with ``async with``; the public methods are coroutines. All the page
+    parsing is inherited from ``Genderifier``, only the fetching differs.
+    Every database call is handed to a single writer thread so the event
+    loop never waits on SQLite.
+    """
+
+    def __init__(self, spotify_token, lastfm_api_key=None, batch_limit=50,
+                 db_file_path=None, force_fetch=False, per_host=10,
+                 timeout=10, concurrency=100, member_workers=4,
+                 **cache_kwargs):
+        """Setup."""
+        super(AsyncGenderifier, self).__init__(
+            spotify_token,
+            lastfm_api_key=lastfm_api_key,
+            batch_limit=batch_limit,
+            db_file_path=db_file_path,
+            force_fetch=force_fetch,
+            timeout=timeout,
+            member_workers=member_workers,
+            **cache_kwargs
+        )
+        self._fetcher = AsyncFetcher(
+            headers=self._get_headers(),
+            per_host=per_host,
+            timeout=timeout,
+            cache=self._cache,
+            scheduler=self._scheduler,
+        )
+        self._concurrency = concurrency
+        self._db_executor = None
+
+    def __enter__(self):
+        raise TypeError("Use AsyncGenderifier with 'async with'.")
+
+    async def __aenter__(self):
+        self._db_executor = ThreadPoolExecutor(max_workers=1)
+        self._conn = await self._db(
+            sqlite3.connect, self._db_file_path, check_same_thread=False
+        )
+        await self._fetcher.open()
+        return self
+
+    async def __aexit__(self, *args):
+        await self._fetcher.close()
+        await self._db(self._commit)
+        await self._db(self._conn.close)
+        self._db_executor.shutdown(wait=True)
+        self._report.close()
+
+    def _db(self, fn, *args, **kwargs):
+        """Run some database work on the writer thread, in this context."""
+        call = functools.partial(
+            contextvars.copy_context().run, fn, *args, **kwargs
+        )
+        return asyncio.get_running_loop().run_in_executor(
+            self._db_executor, call
+        )
+
+    async def _get(self, url, **kwargs):
+        """GET a URL without blocking the loop."""
+        return await self._fetcher.get(url, **kwargs)
+
+    async def _wiki_get(self, url):
+        """GET a Wikipedia page, or as much of it as we need if streaming."""
+        if not self._stream:
+            return await self._get(url)
+        return await self._fetcher.get_streamed(
+            url,
+            WikiStreamWatcher(self._stream_max_paragraphs),
+            max_bytes=self._stream_max_bytes,
+        )
+
+    async def store(self, artist, gender=None, context=None, is_group=False,
+                    lead=None, members=None):
+        """Store the result in the database, and tell us about it!"""
+        return await self._db(
+            super(AsyncGenderifier, self).store,
+            artist, gender, context, is_group, lead, members
+        )
+
+    async def _wiki_get_disambiguated_artist_page(self, page):
+        """Get the actual page from the disambiguation page."""
+        artist = self._current_artist_stack[-1]
+        url = self._wiki_get_band_url(page)
+        if url is not None:
+            self.log(u"Trying Wikipedia URL {}...".format(url))
+            req = await self._wiki_get(url)
+            page = self._wiki_make_page(req.text)
+            if self._wiki_is_artist_page(page):
+                self._current_artist_stack[-1] = Artist(
+                    artist.name, artist.spotify_id, url, artist.lastfm_url
+                )
+                return page
+        return None
+
+    async def _wiki_find_disambiguation(self, page):
+        """Try and find the page that is the disambiguation."""
+        url = self._wiki_get_disambiguation_url(page)
+        if url is not None:
+            self.log(u"Trying Wikipedia URL {}...".format(url))
+            req = await self._wiki_get(url)
+            page = self._wiki_make_page(req.text)
+            if self._wiki_is_disambiguation(page):
+                return await self._wiki_get_disambiguated_artist_page(page)
+            self.log(u"Can't disambiguate at {}".format(url), fg="red")
+
+    async def _wiki_get_artist_page(self):
+        """Try to get the artist page, few options to check..."""
+        artist = self._current_artist_stack[-1]
+        url = self._wiki_get_artist_url(artist)
+        self.log(u"Trying Wikipedia URL {}...".format(url))
+        req = await self._wiki_get(url)
+        page = self._wiki_make_page(req.text)
+        continue_checks = True
+
+        self._current_artist_stack[-1] = Artist(  # update with current url
+            artist.name, artist.spotify_id, url, artist.lastfm_url
+        )
+        if self._wiki_is_redirect(page):
+            continue_checks = False
+
+        if continue_checks and self._wiki_is_disambiguation(page):
+            page = await self._wiki_get_disambiguated_artist_page(page)
+            if page is None:
+                self.log(u"Can't disambiguate at {}".format(url), fg="red")
+                continue_checks = False
+
+        if continue_checks:
+            if self._wiki_is_artist_page(page):
+                return page
+            await self._wiki_find_disambiguation(page)
+
+        # Failed all wiki tries
+        self._current_artist_stack[-1] = artist  # reset
+        self.log(
+            u"The URL scanned probably isn't a musician page... URL was {}"
+            u"".format(url),
+            fg='red'
+        )
+
+    async def _lastfm_get_artist_page(self):
+        """Try to get the artist page, few options to check..."""
+        artist = self._current_artist_stack[-1]
+        url = self._lastfm_get_artist_url(artist)
+        self.log(u"Trying Last.FM URL {}...".format(url))
+        req = await self._get(url)
+        if req.status_code == 404:
+            self.log("The artist was not found.")
+            return None
+        page = self._lastfm_make_page(req.text)
+
+        self._current_artist_stack[-1] = Artist(  # update with current url
+            artist.name, artist.spotify_id, artist.wiki_url, url
+        )
+        return page
+
+    async def _wikiapi_get_titles(self, titles):
+        """Look up where the titles lead, up to 50 a request, all at once."""
+        found = {}
+        for title in titles:
+            if '|' in title:  # can't be a title, and would split the query
+                found[title] = WikiTitle(title, False, True, False)
+        titles = [
+            title for title in titles
+            if title not in found and title not in self._wiki_titles
+        ]
+        chunks = [
+            titles[start:start + WIKI_API_MAX_TITLES]
+            for start in range(0, len(titles), WIKI_API_MAX_TITLES)
+        ]
+        reqs = await asyncio.gather(*[
+            self._get(
+                self._wiki_api_url,
+                params=self._wikiapi_get_query_params(chunk)
+            )
+            for chunk in chunks
+        ])
+        for chunk, req in zip(chunks, reqs):
+            found.update(self._wikiapi_read_titles(chunk, req.json()))
+        for title, info in found.items():
+            self._wiki_titles.put(title, info)
+        return found
+
+    async def _wikiapi_get_title_info(self, title):
+        """Get where a title leads, from the batch's lookup if it was in it."""
+        info = self._wiki_titles.get(title)
+        if info is None:
+            info = (await self._wikiapi_get_titles([title]))[title]
+        return info
+
+    async def _wikiapi_get_page(self, title):
+        """Get the content of a page through the API."""
+        self.log(u"Trying Wikipedia API for {}...".format(title))
+        req = await self._get(
+            self._wiki_api_url, params=self._wikiapi_get_parse_params(title)
+        )
+        return self._wikiapi_read_page(title, req.json())
+
+    async def _wikiapi_get_disambiguated_artist_page(self, page):
+        """Get the actual page from the disambiguation page."""
+        url = self._wiki_get_band_url(page)
+        if url is not None:
+            found = await self._wikiapi_get_title_info(
+                self._wikiapi_get_url_title(url)
+            )
+            page = None if found.missing else await self._wikiapi_get_page(
+                found.title
+            )
+            if page is not None and self._wiki_is_artist_page(page):
+                self._wikiapi_use_page(found.title)
+                return page
+        return None
+
+    async def _wikiapi_get_artist_page(self):
+        """Get the artist page through the API, few options to check..."""
+        artist = self._current_artist_stack[-1]
+        found = await self._wikiapi_get_title_info(
+            self._wikiapi_get_title(artist)
+        )
+        if found.missing:
+            self.log("The artist was not found.")
+            return None
+        if found.redirected:
+            self.log("Page redirects...", fg="red")
+            return None
+
+        page = await self._wikiapi_get_page(found.title)
+        if page is not None and found.disambiguation:
+            page = await self._wikiapi_get_disambiguated_artist_page(page)
+            if page is not None:
+                return page
+        elif page is not None and self._wiki_is_artist_page(page):
+            self._wikiapi_use_page(found.title)
+            return page
+
+        self.log(
+            u"The page probably isn't about a musician... title was {}"
+            u"".format(found.title),
+            fg='red'
+        )
+
+    async def _prefetch(self, sources, artists):
+        """Look up what the sources can for many artists at once, up front."""
+        if 'wikiapi' in sources:
+            try:
+                await self._wikiapi_get_titles(list(dict.fromkeys([
+                    self._wikiapi_get_title(artist) for artist in artists
+                ])))
+            except FetchError as error:  # each tried again in its turn
+                self.log(error, fg='red')
+
+    async def _genderise_from_source(self, source):
+        """Try and get a result from a source, False if it was unsure."""
+        artist_page = await self._get_artist_page(source)
+        if not artist_page:
+            return None
+        if self._is_group(source, artist_page):
+            lead, members = await self._get_group_genders(source, artist_page)
+            return await self.store(
+                self._current_artist_stack[-1],
+                is_group=True,
+                lead=lead,
+                members=members
+            )
+        found = self._get_person_gender(source, artist_page)
+        if not found:
+            return found
+        gender, context = found
+        return await self.store(
+            self._current_artist_stack[-1],
+            gender=gender,
+            context=context
+        )
+
+    async def _get_group_genders(self, source, page):
+        """Get the genders of all the group members."""
+        artists = self._get_group_members(source, page)
+        if artists is None:
+            return None, []
+        await self._prefetch([source], artists)
+        limit = asyncio.Semaphore(max(self._member_workers, 1))
+
+        async def genderise_member(artist):
+            async with limit:
+                return await self.genderise(artist)
+
+        genders = await asyncio.gather(*[
+            genderise_member(artist) for artist in artists
+        ])
+        return self._count_member_genders(artists, list(genders))
+
+    async def _genderise_known_group(self, artist):
+        """Report on each member of a stored group, looking up any not."""
+        members = await self._db(self._get_member_results, artist.name)
+        for member, row in members:
+            if not await self._db(self._report_known_member, member, row):
+                await self.genderise(member)
+
+    async def _genderise_from_sources(self):
+        """Try each source in turn, until one has a result."""
+        sources = list(self._sources)
+        result = None
+        unsure = unreachable = False
+        while len(sources) and result is None:
+            source = sources.pop()
+            try:
+                result = await self._genderise_from_source(source)
+            except FetchError as error:
+                self.log(u"Giving up on {}: {}".format(source, error),
+                         fg="red")
+                unreachable = True
+            if result is False:
+                result, unsure = None, True
+        return result, unsure, unreachable
+
+    async def genderise(self, artist):
+        """Get the gender of the artist name."""
+        self.log(
+            '--------------- {} -----------------'.format(self._offset)
+        )
+        result = await self._db(self._get_known_result, artist)
+        if result is False:
+            return
+        if result:
+            if result.is_group:
+                await self._genderise_known_group(artist)
+                return
+            return result.gender
+
+        self.log(u'Trying to get gender(s) for {}...'.format(artist.name))
+
+        token = self._push_artist(artist)
+        try:
+            result, unsure, unreachable = await self._genderise_from_sources()
+        finally:
+            self._pop_artist(token)
+        if result is not None or not unreachable:
+            await self._db(self._remember_lookup, artist, result, unsure)
+        else:  # try again next time
+            self._batch_incomplete = True
+        return await self._db(self._report_lookup, artist, result)
+
+    async def _iter_batch_artists(self):
+        """Yield the batch's artists, whether it's an async iterable or not."""
+        artists = self._fetched_artists_to_process
+        if hasattr(artists, '__aiter__'):
+            async for artist in artists:
+                yield artist
+        else:
+            for artist in artists:
+                yield artist
+
+    async def _iter_batch(self):
+        """Yield the batch's artists, prefetching for a chunk at a time."""
+        chunk = []
+        async for artist in self._iter_batch_artists():
+            chunk.append(artist)
+            if len(chunk) == BATCH_CHUNK_SIZE:
+                await self._prefetch(self._sources, chunk)
+                for artist in chunk:
+                    yield artist
+                chunk = []
+        if chunk:
+            await self._prefetch(self._sources, chunk)
+            for artist in chunk:
+                yield artist
+
+    async def genderise_batch(self, workers=None):
+        """Genderise the batch, with up to ``workers`` artists in flight.
+
+        Artists are only taken from the batch as there's room for them, so
+        a streamed batch is never all in memory.
+        """
+        limit = workers or self._concurrency
+        self._clear_prefetched()
+        await self._db(self._start_run)
+        snapshot, self._playlist_snapshot = self._playlist_snapshot, None
+        self._unstored_snapshot = None
+        self._batch_incomplete = False
+        offset = await self._db(self._get_offset)
+        artists = self._iter_batch()
+        tasks = {}
+        queued = 0
+        exhausted = False
+        progress = BatchProgress()
+        try:
+            while True:
+                while not exhausted and len(tasks) < limit:
+                    try:
+                        artist = await artists.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    tasks[asyncio.ensure_future(self.genderise(artist))] = (
+                        queued
+                    )
+                    queued += 1
+                if not tasks:
+                    break
+                done, _ = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                advanced = [progress.finish(tasks.pop(task)) for task in done]
+                if any(advanced):
+                    await self._db(
+                        self._set_offset, offset + progress.done_up_to
+                    )
+                for task in done:
+                    task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.wait(tasks)
+            await artists.aclose()
+        await self._db(self._finish_batch, snapshot)
+
+    async def get_db_report(self):
+        """Get report on every artist in the database."""
+        return await self._db(super(AsyncGenderifier, self).get_db_report)
+
+    async def get_playlist_report(self, playlist_id=None):
+        """Get report on a playlist (the last one set) as stored."""
+        return await self._db(
+            super(AsyncGenderifier, self).get_playlist_report, playlist_id
+        )
+
+    async def get_playlist(self, username, playlist_id, fields=None):
+        """Get the playlist JSON (or just the ``fields`` asked for)."""
+        url = self._get_playlist_url(username, playlist_id)
+        req = await self._get(
+            url,
+            params=self._get_playlist_params(fields),
+            headers=self._get_spotify_headers()
+        )
+        return req.json()
+
+    async def set_artist_batch_from_spotify_search(self, offset=None):
+        """Get a batch of artists from Spotify search API, set to process."""
+        self._fetched_artists_to_process = []
+        self._set_batch_source(SEARCH_CHECKPOINT)
+        if offset is None:
+            offset = await self._db(self._get_offset)
+        else:
+            await self._db(self._set_offset, offset)
+
+        self.log("Starting at offset = {}".format(offset), fg='blue')
+        req = await self._get(
+            SPOTIFY_SEARCH_URL,
+            params=self._get_search_query(offset),
+            headers=self._get_spotify_headers()
+        )
+        self._set_artist_batch_from_search_response(req.json())
+
+    async def _get_search_page(self, offset):
+        """Get the artists on the page of Spotify search results at offset."""
+        req = await self._get(
+            SPOTIFY_SEARCH_URL,
+            params=self._get_search_query(offset),
+            headers=self._get_spotify_headers()
+        )
+        return self._get_artists_from_search_response(req.json())
+
+    async def set_artist_stream_from_spotify_search(self, offset=None,
+                                                    ahead=SEARCH_PAGES_AHEAD):
+        """Set every artist from the Spotify search API on, to process."""
+        self._set_batch_source(SEARCH_CHECKPOINT)
+        if offset is None:
+            offset = await self._db(self._get_offset)
+        else:
+            await self._db(self._set_offset, offset)
+
+        self.log("Starting at offset = {}".format(offset), fg='blue')
+        self._fetched_artists_to_process = self._iter_search_artists(
+            offset, ahead
+        )
+
+    async def _iter_search_artists(self, offset, ahead):
+        """Yield the artists from the search pages a task fetches ahead."""
+        pages = asyncio.Queue(maxsize=max(ahead, 1))
+
+        async def produce():
+            at = offset
+            try:
+                artists = True
+                while artists:
+                    artists = await self._get_search_page(at)
+                    await pages.put(artists)
+                    at += len(artists)
+            except Exception as error:  # raised in the consumer instead
+                await pages.put(error)
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                page = await pages.get()
+                if isinstance(page, Exception):
+                    raise page
+                if not page:
+                    return
+                for artist in page:
+                    yield artist
+        finally:
+            producer.cancel()
+
+    async def set_artists_batch_from_spotify_public_playlist(
+        self, url=None, user_id=None, playlist_id=None
+    ):
+        """Set the batch of artists to be from one public Spotify playlist.
+
+        If the playlist is as it was when last looked up, the batch is
+        empty; if it's changed, only the artists added since are in it.
+        """
+        user_id, playlist_id = self._get_playlist_ids(
+            url, user_id, playlist_id
+        )
+        # read through in full each time, so there's no offset to resume
+        self._set_batch_source(
+            u"playlist:{}".format(playlist_id), resumable=False
+        )
+        self._playlist_id = playlist_id
+        snapshot_id = await self._db(
+            self._get_playlist_snapshot_id, playlist_id
+        )
+        if self._is_playlist_unchanged(
+            await self.get_playlist(
+                user_id, playlist_id, PLAYLIST_SNAPSHOT_FIELDS
+            ),
+            snapshot_id
+        ):
+            return
+        known = await self._db(
+            self._get_playlist_keys, playlist_id, snapshot_id
+        )
+        resp = await self.get_playlist(user_id, playlist_id)
+        self._set_artist_batch_from_playlist_response(resp, playlist_id, known)
+
+    async def _iter_unknown_artists(self, artists):
+        """Yield the artists not in the database, checking a chunk at once."""
+        artists = iter(artists)
+        chunk = list(islice(artists, IMPORT_CHUNK_SIZE))
+        while chunk:
+            known = await self._db(
+                self._get_known_name_keys, [a.name for a in chunk]
+            )
+            for artist in chunk:
+                key = normalize_name(artist.name)
+                if key not in known:
+                    known.add(key)
+                    yield artist
+            chunk = list(islice(artists, IMPORT_CHUNK_SIZE))
+
+    async def _get_playlist_tracks(self, url):
+        """Get the page of a playlist's tracks at a ``next`` URL."""
+        req = await self._get(url, headers=self._get_spotify_headers())
+        return req.json()
+
+    async def _iter_playlist_pages(self, tracks):
+        """Yield each page of a playlist's tracks, following the next links.
+
+        The next page is fetched in the background while the one before it
+        is being worked through.
+        """
+        next_page = None
+        try:
+            while tracks is not None:
+                next_url = tracks.get('next')
+                next_page = asyncio.ensure_future(
+                    self._get_playlist_tracks(next_url)
+                ) if next_url else None
+                yield tracks
+                tracks = await next_page if next_page else None
+        finally:
+            if next_page is not None and not next_page.done():
+                next_page.cancel()
+
+    async def _iter_playlist_artists(self, pages, snapshot=None,
+                                     known=frozenset()):
+        """Yield each artist on the playlist once, in order."""
+        seen = set()
+        position = 0
+        async for tracks in pages:
+            artists = self._get_new_playlist_artists(tracks, seen)
+            if snapshot is not None:
+                await self._db(
+                    self._store_playlist_artists, *snapshot, position, artists
+                )
+            position += len(artists)
+            for artist in artists:
+                if normalize_name(artist.name) not in known:
+                    yield artist
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict, namedtuple
+import sqlite3
+import threading
+import time
+import zlib
+
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_LRU_SIZE = 10000
+
+CacheEntry = namedtuple(
+    'CacheEntry',
+    ['url', 'status_code', 'text', 'etag', 'last_modified', 'fetched_at']
+)
+
+
+class ResponseCache(object):
+    """Compressed on-disk store of fetched pages, keyed by URL.
+
+    Entries younger than ``ttl`` seconds are served without asking the
+    server; older ones are revalidated with their ETag/Last-Modified. When
+    the compressed bodies pass ``max_bytes``, the least recently used are
+    evicted.
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        """Setup."""
+        self._path = path or '.genderify-cache.db'
+        self._ttl = ttl
+        self._max_bytes = max_bytes
+        self._conn = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def open(self):
+        """Open (and create if need be) the cache database."""
+        self._conn = sqlite3.connect(self._path, check_same_thread=False)
+        # it's only a cache, so don't wait on the disk for every hit
+        self._conn.execute("PRAGMA synchronous = OFF")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                status_code INTEGER,
+                body BLOB,
+                size INTEGER,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL,
+                accessed_at REAL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at "
+            "ON responses(accessed_at)"
+        )
+        self._conn.commit()
+        total = self._conn.execute(
+            "SELECT SUM(size) FROM responses"
+        ).fetchone()[0]
+        self._size = total or 0
+        return self
+
+    def close(self):
+        """Close the cache database."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def get(self, url):
+        """Get the cached entry for a URL, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status_code, body, etag, last_modified, "
+                "fetched_at FROM responses WHERE url = ?",
+                (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE url = ?",
+                (time.time(), url)
+            )
+            self._conn.commit()
+        text = zlib.decompress(row[2]).decode('utf-8')
+        return CacheEntry(row[0], row[1], text, row[3], row[4], row[5])
+
+    def is_fresh(self, entry):
+        """Return True if the entry can be used without revalidating."""
+        return time.time() - entry.fetched_at < self._ttl
+
+    def get_conditional_headers(self, entry):
+        """Get the headers to revalidate a stale entry with."""
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def refresh(self, url):
+        """Mark an entry as fresh again, e.g. after a 304."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET fetched_at = ? WHERE url = ?",
+                (time.time(), url)
+            )
+            self._conn.commit()
+
+    def put(self, url, status_code, text, headers=None):
+        """Store a page, evicting old ones if we've gone over size."""
+        headers = CaseInsensitiveDict(headers or {})
+        body = zlib.compress(text.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses(url, status_code, body, "
+                "size, etag, last_modified, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url, status_code, body, len(body),
+                    headers.get('ETag'), headers.get('Last-Modified'),
+                    now, now
+                )
+            )
+            self._size += len(body) - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop the least recently used entries until we're under size."""
+        while self._size > self._max_bytes:
+            row = self._conn.execute(
+                "SELECT url, size FROM responses "
+                "ORDER BY accessed_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                self._size = 0
+                return
+            self._conn.execute("DELETE FROM responses WHERE url = ?", (row[0],))
+            self._size -= row[1]
+
+
+class LRUCache(object):
+    """Bounded in-memory map, dropping the least recently used keys.
+
+    Keeps count of its hits and misses, to tell whether it's big enough.
+    """
+
+    def __init__(self, max_size=DEFAULT_LRU_SIZE):
+        """Setup."""
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        """Get the value for a key, marking it as just used."""
+        with self._lock:
+            try:
+                self._items.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return self._items[key]
+
+    def put(self, key, value):
+        """Keep a value, dropping the oldest if we've gone over size."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def discard(self, key):
+        """Forget a key, if we have it."""
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        """Forget every key."""
+        with self._lock:
+            self._items.clear()
+
+    def get_stats(self):
+        """Get the hit and miss counts, and how full we are."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._items),
+            'max_size': self.max_size,
+        }
@@ -0,0 +1,490 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import codecs
+from email.utils import parsedate_to_datetime
+import functools
+import json
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+import requests
+
+try:
+    import aiohttp
+except ImportError:  # nocov
+    aiohttp = None
+
+POOLED_HOSTS = (
+    'https://en.wikipedia.org',
+    'https://www.last.fm',
+    'https://api.spotify.com',
+)
+CACHED_HOSTS = (
+    'en.wikipedia.org',
+    'www.last.fm',
+)
+CACHED_STATUS_CODES = (200, 404)
+STREAM_MAX_BYTES = 256 * 1024
+STREAM_CHUNK_SIZE = 16 * 1024
+# Worth another go, after a while.
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# ...and a sign we're going too fast for the host.
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+def get_cache_key(url, params=None):
+    """Get the full URL a request is cached under, or None if it isn't."""
+    if urlsplit(url).netloc not in CACHED_HOSTS:
+        return None
+    return requests.Request('GET', url, params=params).prepare().url
+
+
+class FetchError(RuntimeError):
+    """A GET that still failed after all its retries."""
+
+
+def get_retry_after(value):
+    """Get the seconds a Retry-After header asks us to wait, if it's valid."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter(object):
+    """Token bucket letting ``rate`` calls a second through, on any thread.
+
+    Callers queue up for tokens in turn, so a burst of them is spread out
+    at the rate rather than all retrying at once. No ``rate`` is no limit.
+    """
+
+    def __init__(self, rate=None, burst=1):
+        """Setup."""
+        self.rate = rate
+        self._burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take the next turn, and return how long to wait for it."""
+        if not self.rate:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._burst,
+                self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            return max(-self._tokens / self.rate, 0)
+
+    def wait(self):
+        """Block until the next call is allowed."""
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+
+class HostScheduler(object):
+    """Share out each host's request budget between all the workers.
+
+    Every host gets a token bucket, at its rate in ``rates`` (or no limit).
+    When a host throttles us, its rate halves and every request to it waits
+    out the Retry-After; each success after that wins a little rate back,
+    up to where it started. That keeps us just under the host's limit
+    rather than flapping in and out of a ban. Failed requests are retried
+    ``retries`` times, after a jittered exponential backoff.
+    """
+
+    def __init__(self, rates=None, retries=4, backoff=0.5, max_backoff=60,
+                 throttled_rate=10, min_rate=0.1, recovery=0.1):
+        """Setup."""
+        self._rates = dict(rates or {})
+        self.retries = retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._throttled_rate = throttled_rate
+        self._min_rate = min_rate
+        self._recovery = recovery
+        self._limiters = {}
+        self._paused_until = {}
+        self._lock = threading.Lock()
+
+    def _get_limiter(self, host):
+        """Get the host's token bucket."""
+        with self._lock:
+            if host not in self._limiters:
+                self._limiters[host] = RateLimiter(self._rates.get(host))
+            return self._limiters[host]
+
+    def set_rate(self, host, rate):
+        """Let up to ``rate`` requests a second through to the host."""
+        self._rates[host] = rate
+        self._get_limiter(host).rate = rate
+
+    def reserve(self, url):
+        """Take the URL's host's next turn, return how long to wait for it."""
+        return max(
+            self._get_limiter(urlsplit(url).netloc).reserve(), self.paused(url)
+        )
+
+    def paused(self, url):
+        """Get how much longer the URL's host is paused for, if at all."""
+        host = urlsplit(url).netloc
+        return max(self._paused_until.get(host, 0) - time.monotonic(), 0)
+
+    def succeeded(self, url):
+        """Win back a little rate for a host that had throttled us."""
+        host = urlsplit(url).netloc
+        limiter = self._get_limiter(host)
+        ceiling = self._rates.get(host)
+        with self._lock:
+            if host in self._paused_until and limiter.rate:
+                limiter.rate += self._recovery
+                if ceiling and limiter.rate >= ceiling:
+                    limiter.rate = ceiling
+
+    def failed(self, url, attempt, status_code=None, retry_after=None):
+        """Note a failed try, and return how long to wait before the next.
+
+        A throttled host is slowed down and paused for everyone.
+        """
+        host = urlsplit(url).netloc
+        delay = get_retry_after(retry_after)
+        if delay is None:
+            delay = random.uniform(
+                0, min(self._max_backoff, self._backoff * 2 ** attempt)
+            )
+        if status_code in THROTTLE_STATUS_CODES:
+            limiter = self._get_limiter(host)
+            with self._lock:
+                limiter.rate = max(
+                    (limiter.rate or self._throttled_rate * 2) / 2,
+                    self._min_rate
+                )
+                self._paused_until[host] = max(
+                    self._paused_until.get(host, 0), time.monotonic() + delay
+                )
+        return delay
+
+
+class Response(object):
+    """A fetched page, for when there's no ``requests.Response`` to hand."""
+
+    def __init__(self, url, status_code, text, headers=None,
+                 truncated=False):
+        """Setup."""
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self.truncated = truncated
+
+    def json(self):
+        """Decode the body as JSON."""
+        return json.loads(self.text)
+
+
+class Fetcher(object):
+    """Pooled, keep-alive HTTP client shared by all the lookups."""
+
+    def __init__(self, headers=None, pool_size=10, timeout=10,
+                 hosts=POOLED_HOSTS, cache=None, scheduler=None):
+        """Setup."""
+        self._headers = headers or {}
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._hosts = hosts
+        self._cache = cache
+        self._scheduler = scheduler or HostScheduler()
+        self._session = None
+
+    def open(self):
+        """Create the session, with one connection pool per host."""
+        session = requests.Session()
+        session.headers.update(self._headers)
+        for host in self._hosts:
+            session.mount(host, HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=self._pool_size,
+            ))
+        self._session = session
+        if self._cache is not None:
+            self._cache.open()
+        return self
+
+    def close(self):
+        """Drop all the pooled connections."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        if self._cache is not None:
+            self._cache.close()
+
+    def _send(self, url, **kwargs):
+        """GET the URL in its host's turn, retrying if it's worth it."""
+        for attempt in range(self._scheduler.retries + 1):
+            time.sleep(self._scheduler.reserve(url))
+            time.sleep(self._scheduler.paused(url))  # throttled meanwhile?
+            status_code = retry_after = None
+            try:
+                resp = self._session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                problem = error
+            else:
+                if resp.status_code not in RETRY_STATUS_CODES:
+                    self._scheduler.succeeded(url)
+                    return resp
+                status_code = resp.status_code
+                retry_after = resp.headers.get('Retry-After')
+                problem = u"HTTP {}".format(status_code)
+                resp.close()
+            if attempt < self._scheduler.retries:
+                time.sleep(self._scheduler.failed(
+                    url, attempt, status_code, retry_after
+                ))
+        raise FetchError(u"Gave up on {} after {} tries ({})".format(
+            url, attempt + 1, problem
+        ))
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        """GET the URL over a pooled connection, or from the cache."""
+        if self._session is None:
+            raise RuntimeError("Fetcher used before open().")
+        kwargs.setdefault('timeout', self._timeout)
+        key = get_cache_key(url, params) if self._cache else None
+        entry = self._cache.get(key) if key else None
+        if entry is not None:
+            if self._cache.is_fresh(entry):
+                return Response(entry.url, entry.status_code, entry.text)
+            headers = dict(headers or {})
+            headers.update(self._cache.get_conditional_headers(entry))
+
+        resp = self._send(url, params=params, headers=headers, **kwargs)
+        if entry is not None and resp.status_code == 304:
+            self._cache.refresh(key)
+            return Response(entry.url, entry.status_code, entry.text)
+        if key and resp.status_code in CACHED_STATUS_CODES:
+            self._cache.put(key, resp.status_code, resp.text, resp.headers)
+        return resp
+
+    def get_streamed(self, url, watcher, max_bytes=STREAM_MAX_BYTES,
+                     headers=None, **kwargs):
+        """GET the URL a chunk at a time, until the watcher has seen enough.
+
+        Each chunk of text is fed to ``watcher``, and we stop downloading
+        once its ``done`` is True or ``max_bytes`` have come in. A body cut
+        short like that comes back with ``truncated`` set, and isn't cached.
+        """
+        if self._session is None:
+            raise RuntimeError("Fetcher used before open().")
+        kwargs.setdefault('timeout', self._timeout)
+        key = get_cache_key(url) if self._cache else None
+        entry = self._cache.get(key) if key else None
+        if entry is not None:
+            if self._cache.is_fresh(entry):
+                return Response(entry.url, entry.status_code, entry.text)
+            headers = dict(headers or {})
+            headers.update(self._cache.get_conditional_headers(entry))
+
+        resp = self._send(url, headers=headers, stream=True, **kwargs)
+        try:
+            if entry is not None and resp.status_code == 304:
+                self._cache.refresh(key)
+                return Response(entry.url, entry.status_code, entry.text)
+            decoder = codecs.getincrementaldecoder(
+                resp.encoding or 'utf-8'
+            )(errors='replace')
+            text = []
+            read = 0
+            truncated = False
+            for chunk in resp.iter_content(STREAM_CHUNK_SIZE):
+                read += len(chunk)
+                text.append(decoder.decode(chunk))
+                watcher.feed(text[-1])
+                if watcher.done or read >= max_bytes:
+                    truncated = True
+                    break
+            else:
+                text.append(decoder.decode(b'', final=True))
+        finally:
+            resp.close()
+        streamed = Response(
+            resp.url, resp.status_code, u"".join(text), resp.headers,
+            truncated=truncated
+        )
+        if key and not truncated and (
+            resp.status_code in CACHED_STATUS_CODES
+        ):
+            self._cache.put(key, resp.status_code, streamed.text, resp.headers)
+        return streamed
+
+
+class AsyncFetcher(object):
+    """Non-blocking HTTP client, with a concurrency limit on each host."""
+
+    def __init__(self, headers=None, per_host=10, timeout=10, cache=None,
+                 scheduler=None):
+        """Setup."""
+        self._headers = headers or {}
+        self._per_host = per_host
+        self._timeout = timeout
+        self._cache = cache
+        self._scheduler = scheduler or HostScheduler()
+        self._semaphores = {}
+        self._session = None
+
+    async def open(self):
+        """Create the session."""
+        if aiohttp is None:
+            raise RuntimeError("Async fetching needs aiohttp installed.")
+        self._session = aiohttp.ClientSession(
+            headers=self._headers,
+            timeout=aiohttp.ClientTimeout(total=self._timeout),
+            connector=aiohttp.TCPConnector(limit=0),
+        )
+        if self._cache is not None:
+            await self._in_thread(self._cache.open)
+        return self
+
+    async def close(self):
+        """Drop all the pooled connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._cache is not None:
+            await self._in_thread(self._cache.close)
+
+    def _in_thread(self, fn, *args):
+        """Run blocking cache work off the event loop."""
+        return asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    def _get_semaphore(self, url):
+        """Get the semaphore limiting requests to the URL's host."""
+        host = urlsplit(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self._per_host)
+        return self._semaphores[host]
+
+    async def _send(self, url, read, **kwargs):
+        """GET the URL in its host's turn, retrying if it's worth it.
+
+        The body is read by ``read(resp)``, while the connection is held.
+        """
+        for attempt in range(self._scheduler.retries + 1):
+            await asyncio.sleep(self._scheduler.reserve(url))
+            await asyncio.sleep(self._scheduler.paused(url))
+            status_code = retry_after = None
+            try:
+                async with self._get_semaphore(url):
+                    async with self._session.get(url, **kwargs) as resp:
+                        if resp.status not in RETRY_STATUS_CODES:
+                            self._scheduler.succeeded(url)
+                            return await read(resp)
+                        status_code = resp.status
+                        retry_after = resp.headers.get('Retry-After')
+                        problem = u"HTTP {}".format(status_code)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                problem = error
+            if attempt < self._scheduler.retries:
+                await asyncio.sleep(self._scheduler.failed(
+                    url, attempt, status_code, retry_after
+                ))
+        raise FetchError(u"Gave up on {} after {} tries ({})".format(
+            url, attempt + 1, problem
+        ))
+
+    async def _read(self, resp):
+        """Read a whole response."""
+        text = await resp.text()
+        return Response(str(resp.url), resp.status, text, dict(resp.headers))
+
+    async def _read_streamed(self, watcher, max_bytes, resp):
+        """Read a response until the watcher has seen enough."""
+        decoder = codecs.getincrementaldecoder(
+            resp.charset or 'utf-8'
+        )(errors='replace')
+        text = []
+        read = 0
+        truncated = False
+        async for chunk in resp.content.iter_chunked(STREAM_CHUNK_SIZE):
+            read += len(chunk)
+            text.append(decoder.decode(chunk))
+            watcher.feed(text[-1])
+            if watcher.done or read >= max_bytes:
+                truncated = True
+                break
+        else:
+            text.append(decoder.decode(b'', final=True))
+        return Response(
+            str(resp.url), resp.status, u"".join(text), dict(resp.headers),
+            truncated=truncated
+        )
+
+    async def get(self, url, params=None, headers=None):
+        """GET the URL, waiting for a free slot on its host."""
+        if self._session is None:
+            raise RuntimeError("AsyncFetcher used before open().")
+        key = get_cache_key(url, params) if self._cache else None
+        entry = await self._in_thread(self._cache.get, key) if key else None
+        if entry is not None:
+            if self._cache.is_fresh(entry):
+                return Response(entry.url, entry.status_code, entry.text)
+            headers = dict(headers or {})
+            headers.update(self._cache.get_conditional_headers(entry))
+
+        resp = await self._send(
+            url, self._read, params=params, headers=headers
+        )
+        if entry is not None and resp.status_code == 304:
+            await self._in_thread(self._cache.refresh, key)
+            return Response(entry.url, entry.status_code, entry.text)
+        if key and resp.status_code in CACHED_STATUS_CODES:
+            await self._in_thread(
+                self._cache.put, key, resp.status_code, resp.text,
+                resp.headers
+            )
+        return resp
+
+    async def get_streamed(self, url, watcher, max_bytes=STREAM_MAX_BYTES,
+                           headers=None):
+        """GET the URL a chunk at a time, until the watcher has seen enough.
+
+        As ``Fetcher.get_streamed``, without blocking the loop.
+        """
+        if self._session is None:
+            raise RuntimeError("AsyncFetcher used before open().")
+        key = get_cache_key(url) if self._cache else None
+        entry = await self._in_thread(self._cache.get, key) if key else None
+        if entry is not None:
+            if self._cache.is_fresh(entry):
+                return Response(entry.url, entry.status_code, entry.text)
+            headers = dict(headers or {})
+            headers.update(self._cache.get_conditional_headers(entry))
+
+        resp = await self._send(
+            url, functools.partial(self._read_streamed, watcher, max_bytes),
+            headers=headers
+        )
+        if entry is not None and resp.status_code == 304:
+            await self._in_thread(self._cache.refresh, key)
+            return Response(entry.url, entry.status_code, entry.text)
+        if key and not resp.truncated and (
+            resp.status_code in CACHED_STATUS_CODES
+        ):
+            await self._in_thread(
+                self._cache.put, key, resp.status_code, resp.text,
+                resp.headers
+            )
+        return resp
@@ -1,22 +1,95 @@
 # -*- coding: utf-8 -*-
 from collections import namedtuple, Counter
-import re
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+import contextvars
+from itertools import islice
+import queue
 import sqlite3
+import threading
+import time
+from urllib.parse import unquote, urlsplit
 
-from bs4 import BeautifulSoup
 import click
-import requests
 
-PRONOUN_MAP = {
-    'their': 'nonbinary',
-    'they': 'nonbinary',
-    'them': 'nonbinary',
-    'her': 'female',
-    'she': 'female',
-    'his': 'male',
-    'him': 'male',
-    'he': 'male',
-}
+from genderify.cache import (
+    DEFAULT_LRU_SIZE,
+    DEFAULT_MAX_BYTES,
+    DEFAULT_TTL,
+    LRUCache,
+    ResponseCache,
+)
+from genderify.fetch import (
+    STREAM_MAX_BYTES,
+    FetchError,
+    Fetcher,
+    HostScheduler,
+)
+from genderify.parsing import (
+    LASTFM_STRAINER,
+    STREAM_MAX_PARAGRAPHS,
+    WIKI_STRAINER,
+    LastFMPage,
+    WikiPage,
+    WikiStreamWatcher,
+    make_soup,
+)
+from genderify.pronouns import (  # noqa
+    PRONOUN_MAP,
+    get_gender_and_context,
+    score_gender,
+)
+from genderify.report import (
+    ReportAggregator,
+    format_report,
+    get_db_report,
+    get_playlist_report,
+)
+from genderify.schema import SEARCH_CHECKPOINT, migrate, normalize_name
+
+DB_FILE_PATH = '.genderify.db'
+SPOTIFY_SEARCH_URL = "https://api.spotify.com/v1/search"
+LASTFM_API_URL = "http://ws.audioscrobbler.com/2.0/"
+# Last.FM ask for no more than 5 requests a second.
+LASTFM_API_RATE = 5
+WIKI_API_URL = "https://en.wikipedia.org/w/api.php"
+WIKI_API_MAX_TITLES = 50
+# How many of a batch's artists to prefetch for at a time.
+BATCH_CHUNK_SIZE = 50
+# How many prefetched titles (and Last.FM infos) to keep, for the chunks
+# being worked on; older ones are dropped, so a batch that never ends (or
+# is millions of names long) doesn't keep them all.
+PREFETCH_CACHE_SIZE = 1000
+# How many Spotify search pages to keep fetched ahead of the lookups.
+SEARCH_PAGES_AHEAD = 2
+# Just enough of a playlist to tell if it's changed since it was looked up.
+PLAYLIST_SNAPSHOT_FIELDS = 'snapshot_id,name,description'
+# What runs of imported names are recorded as coming from.
+IMPORT_RUN_SOURCE = 'import'
+# How many imported names to check the database for at once (two query
+# parameters each, under SQLite's old limit of 999).
+IMPORT_CHUNK_SIZE = 400
+
+ARTIST_COLUMNS = (
+    "id, name, spotify_id, wiki_url, lastfm_url, context, gender, is_group, "
+    "lead_gender, nonbinary_count, female_count, male_count, unknown_count, "
+    "member_names"
+)
+# ...of each member's own row, when joined through group_members.
+MEMBER_ARTIST_COLUMNS = ", ".join([
+    "member." + column for column in ARTIST_COLUMNS.split(", ")
+])
+
+CLASSIFIERS = ('first', 'score')
+# Tried last to first.
+SOURCES = ('wiki', 'lastfm')
+
+MISS_BACKOFF = 24 * 60 * 60
+MAX_MISS_BACKOFF = 30 * 24 * 60 * 60
 
 
 DBRow = namedtuple(
@@ -24,43 +97,212 @@ DBRow = namedtuple(
     ['artist', 'context', 'gender', 'is_group', 'lead', 'members']
 )
 Artist = namedtuple('Artist', ['name', 'spotify_id', 'wiki_url', 'lastfm_url'])
+# ``artists`` are the members in order, when just looked up.
 MemberResults = namedtuple(
     'MemberResults',
-    ['nonbinary', 'female', 'male', 'unknown', 'names']
+    ['nonbinary', 'female', 'male', 'unknown', 'names', 'artists'],
+    defaults=[()]
+)
+# Where a title looked up through the Wikipedia API ended up.
+WikiTitle = namedtuple(
+    'WikiTitle', ['title', 'redirected', 'missing', 'disambiguation']
 )
 
 
+class BatchProgress(object):
+    """Track how far into a batch every artist has finished.
+
+    Artists can finish out of order, so ``done_up_to`` only moves past the
+    unbroken run of finished ones - resuming from it never skips an artist
+    that was still in flight.
+    """
+
+    def __init__(self):
+        """Setup."""
+        self._finished = set()
+        self.done_up_to = 0
+
+    def finish(self, ix):
+        """Mark the artist at this index done, return True if we advanced."""
+        self._finished.add(ix)
+        advanced = False
+        while self.done_up_to in self._finished:
+            self._finished.discard(self.done_up_to)
+            self.done_up_to += 1
+            advanced = True
+        return advanced
+
+
+class PagesAhead(object):
+    """Iterate over pages of artists fetched ahead on a thread.
+
+    ``get_page(offset)`` gets the page of artists at an offset; up to
+    ``ahead`` pages are kept queued, until an empty page. An error getting
+    one is raised where the pages are iterated over instead.
+    """
+
+    def __init__(self, get_page, offset, ahead):
+        """Setup."""
+        self._get_page = get_page
+        self._offset = offset
+        self._pages = queue.Queue(maxsize=max(ahead, 1))
+        self._stop = threading.Event()
+
+    def _put(self, page):
+        """Queue a page, once there's room, return False if stopped first."""
+        while not self._stop.is_set():
+            try:
+                self._pages.put(page, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(self):
+        """Get pages until an empty one, or we're stopped."""
+        at = self._offset
+        try:
+            artists = True
+            while artists and not self._stop.is_set():
+                artists = self._get_page(at)
+                self._put(artists)
+                at += len(artists)
+        except Exception as error:  # raised in the consumer instead
+            self._put(error)
+
+    def __iter__(self):
+        """Yield the pages, stopping the thread once done with them."""
+        producer = threading.Thread(target=self._produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                page = self._pages.get()
+                if isinstance(page, Exception):
+                    raise page
+                if not page:
+                    return
+                yield page
+        finally:
+            self._stop.set()
+            producer.join()
+
+
 class Genderifier(object):
     """Singleton to handle stateful traversing of gender lookups."""
 
     def __init__(self, spotify_token, lastfm_api_key=None, batch_limit=50,
-                 db_file_path=None, force_fetch=False):
+                 db_file_path=None, force_fetch=False, pool_size=10,
+                 timeout=10, member_workers=4, use_cache=True,
+                 cache_file_path=None, cache_ttl=DEFAULT_TTL,
+                 cache_max_bytes=DEFAULT_MAX_BYTES, miss_backoff=MISS_BACKOFF,
+                 max_miss_backoff=MAX_MISS_BACKOFF, commit_every=50,
+                 commit_interval=5, keep_checkpoint_history=False,
+                 parser=None, strain=True, legacy_context=True,
+                 classifier='first', min_confidence=0.6, stream=False,
+                 stream_max_bytes=STREAM_MAX_BYTES,
+                 stream_max_paragraphs=STREAM_MAX_PARAGRAPHS,
+                 sources=SOURCES, wiki_api_url=WIKI_API_URL, host_rates=None,
+                 retries=4, row_cache_size=DEFAULT_LRU_SIZE,
+                 report_detail_path=None):
         """Setup."""
-        self._db_file_path = db_file_path or '.genderify.db'
+        self._db_file_path = db_file_path or DB_FILE_PATH
         self._conn = None
+        self._commit_every = commit_every
+        self._commit_interval = commit_interval
+        self._uncommitted = 0
+        self._committed_at = time.time()
+        self._offset = 0
+        # what the batch is from, and the source to checkpoint it as (if any)
+        self._batch_source = SEARCH_CHECKPOINT
+        self._checkpoint_source = SEARCH_CHECKPOINT
+        self._keep_checkpoint_history = keep_checkpoint_history
+        self._uncommitted_checkpoints = {}
+        self._run_id = None
+        self._run_source = None
+        self._uncommitted_run_artists = set()
+        self._cache = ResponseCache(
+            path=cache_file_path,
+            ttl=cache_ttl,
+            max_bytes=cache_max_bytes,
+        ) if use_cache else None
+        self._scheduler = HostScheduler(rates=host_rates, retries=retries)
+        self._fetcher = Fetcher(
+            headers=self._get_headers(),
+            pool_size=pool_size,
+            timeout=timeout,
+            cache=self._cache,
+            scheduler=self._scheduler,
+        )
         self._did_check_db_existing = False
+        # (decoded artists row, (reason, retry_after) of a miss) by name_key,
+        # either None if not stored
+        self._rows = LRUCache(row_cache_size)
         self._fetched_artists_to_process = []
-        self._current_artist_stack = []
+        self._artist_stack = contextvars.ContextVar(
+            'artist_stack', default=()
+        )
+        self._lock = threading.RLock()
         self._spotify_token = spotify_token
         self._playlist_name = None
         self._playlist_description = None
+        # the playlist last set, the snapshot of it to store once done, and
+        # the last one read through that couldn't be
+        self._playlist_id = None
+        self._playlist_snapshot = None
+        self._unstored_snapshot = None
+        self._batch_incomplete = False
         self._batch_limit = batch_limit
         self._lastfm_api_key = lastfm_api_key
         self._force_fetch = force_fetch
-        self._report = {
-            'artists': set(),
-            'nonbinary': [],
-            'female': [],
-            'male': [],
-            'unknown': [],
-        }
+        self._member_workers = member_workers
+        self._parser = parser
+        self._strain = strain
+        self._legacy_context = legacy_context
+        if classifier not in CLASSIFIERS:
+            raise ValueError(u"Unknown classifier {}".format(classifier))
+        self._classifier = classifier
+        self._min_confidence = min_confidence
+        self._stream = stream
+        self._stream_max_bytes = stream_max_bytes
+        self._stream_max_paragraphs = stream_max_paragraphs
+        self._sources = list(sources)
+        self._wiki_api_url = wiki_api_url
+        self._wiki_titles = LRUCache(PREFETCH_CACHE_SIZE)
+        self._miss_backoff = miss_backoff
+        self._max_miss_backoff = max_miss_backoff
+        self._report = ReportAggregator(report_detail_path)
 
     def __enter__(self):
-        self._conn = sqlite3.connect(self._db_file_path)
+        self._conn = sqlite3.connect(
+            self._db_file_path, check_same_thread=False
+        )
+        self._fetcher.open()
         return self
 
     def __exit__(self, *args):
+        self._fetcher.close()
+        self._commit()
         self._conn.close()
+        self._report.close()
+
+    @property
+    def _current_artist_stack(self):
+        """The artists being looked up by this thread or task, outermost first.
+
+        Each lookup pushes a fresh copy of the stack, so concurrent lookups
+        never see (or clobber) each other's artist.
+        """
+        return self._artist_stack.get()
+
+    def _push_artist(self, artist):
+        """Start looking up an artist, return a token to pop it again."""
+        return self._artist_stack.set(
+            list(self._current_artist_stack) + [artist]
+        )
+
+    def _pop_artist(self, token):
+        """Finish looking up the artist pushed with this token."""
+        self._artist_stack.reset(token)
 
     def log(self, msg, fg=None):
         """Log but with indent."""
@@ -69,53 +311,15 @@ class Genderifier(object):
 
     def _get_db(self):
         """Just setup the database and return a cursor."""
-        curs = self._conn.cursor()
         if not self._did_check_db_existing:
-            curs.execute(
-                "SELECT name FROM sqlite_master WHERE type='table' AND "
-                "name='meta'"
-            )
-            meta_exists = curs.fetchone()
-            if not meta_exists:
-                curs.execute(
-                    """
-                    CREATE TABLE meta (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
-                        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
-                        offset INTEGER
-
-                    )
-                    """
-                )
-
-            curs.execute(
-                "SELECT name FROM sqlite_master "
-                "WHERE type='table' AND name='artists'"
-            )
-            artists_exists = curs.fetchone()
-            if not artists_exists:
-                curs.execute(
-                    """
-                    CREATE TABLE artists (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT,
-                        spotify_id TEXT,
-                        wiki_url TEXT,
-                        lastfm_url TEXT,
-                        context TEXT,
-                        gender TEXT,
-                        is_group BOOLEAN,
-                        lead_gender TEXT,
-                        nonbinary_count INT,
-                        female_count INT,
-                        male_count INT,
-                        unknown_count INT,
-                        member_names TEXT
-                    )
-                    """
-                )
+            migrate(self._conn)
             self._did_check_db_existing = True
-        return curs
+        return self._conn.cursor()
+
+    @property
+    def row_cache_stats(self):
+        """How often the artist row cache has saved a database query."""
+        return self._rows.get_stats()
 
     @property
     def playlist_name(self):
@@ -136,77 +340,419 @@ class Genderifier(object):
             lastfm_url=None
         )
 
+    def _commit(self):
+        """Commit everything written so far."""
+        with self._lock:
+            if self._keep_checkpoint_history and \
+                    self._uncommitted_checkpoints:
+                # one row per source per commit keeps the history compact
+                self._conn.executemany(
+                    "INSERT INTO checkpoint_history(source, offset) "
+                    "VALUES (?, ?)",
+                    self._uncommitted_checkpoints.items()
+                )
+            self._uncommitted_checkpoints.clear()
+            if self._uncommitted_run_artists:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO run_artists(run_id, name_key) "
+                    "VALUES (?, ?)",
+                    self._uncommitted_run_artists
+                )
+                self._uncommitted_run_artists.clear()
+            self._conn.commit()
+            self._uncommitted = 0
+            self._committed_at = time.time()
+
+    def _commit_later(self):
+        """Count a write, committing once enough (or long enough) pile up.
+
+        Offsets are written in the same transaction as the artists they
+        cover, so a crash loses both together and the resume redoes them.
+        """
+        with self._lock:
+            self._uncommitted += 1
+            if (
+                self._uncommitted >= self._commit_every or
+                time.time() - self._committed_at >= self._commit_interval
+            ):
+                self._commit()
+
     def _delete_artist(self, name):
-        """Delete the artist."""
-        curs = self._get_db()
-        try:
+        """Delete the artist (and its members, if a group)."""
+        with self._lock:
+            self._rows.discard(normalize_name(name))
+            curs = self._get_db()
+            try:
+                curs.execute(
+                    "DELETE FROM group_members WHERE group_id IN ("
+                    "SELECT id FROM artists WHERE name_key = ?)",
+                    (normalize_name(name),)
+                )
+                curs.execute(
+                    "DELETE FROM artists WHERE name_key = ?",
+                    (normalize_name(name),)
+                )
+                self._commit_later()
+                return True
+            except sqlite3.ProgrammingError as err:
+                self.log(err, fg='red')
+
+    def _store_artist(self, row):
+        """Store the results, return the artist's row id.
+
+        The write isn't counted towards a commit; ``store`` does that.
+        """
+        with self._lock:
+            self._rows.discard(normalize_name(row[0]))
+            curs = self._get_db()
+            try:
+                curs.execute(
+                    """
+                    INSERT INTO artists(
+                        name,
+                        spotify_id,
+                        wiki_url,
+                        lastfm_url,
+                        context,
+                        gender,
+                        is_group,
+                        lead_gender,
+                        nonbinary_count,
+                        female_count,
+                        male_count,
+                        unknown_count,
+                        member_names,
+                        name_key
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(name_key) DO UPDATE SET
+                        name = excluded.name,
+                        spotify_id = excluded.spotify_id,
+                        wiki_url = excluded.wiki_url,
+                        lastfm_url = excluded.lastfm_url,
+                        context = excluded.context,
+                        gender = excluded.gender,
+                        is_group = excluded.is_group,
+                        lead_gender = excluded.lead_gender,
+                        nonbinary_count = excluded.nonbinary_count,
+                        female_count = excluded.female_count,
+                        male_count = excluded.male_count,
+                        unknown_count = excluded.unknown_count,
+                        member_names = excluded.member_names
+                    """,
+                    tuple(row) + (normalize_name(row[0]),)
+                )
+                curs.execute(
+                    "SELECT id FROM artists WHERE name_key = ?",
+                    (normalize_name(row[0]),)
+                )
+                artist_id = curs.fetchone()[0]
+                # link up any groups this artist is a member of
+                curs.execute(
+                    "UPDATE group_members SET member_id = ? "
+                    "WHERE member_key = ?",
+                    (artist_id, normalize_name(row[0]))
+                )
+                return artist_id
+            except sqlite3.ProgrammingError as err:
+                self.log(err, fg='red')
+
+    def _store_group_members(self, group_id, artists):
+        """Store a group's members in order, linked to their own rows."""
+        with self._lock:
+            curs = self._get_db()
             curs.execute(
-                "DELETE FROM artists WHERE name = ?",
-                (name,)
+                "DELETE FROM group_members WHERE group_id = ?", (group_id,)
+            )
+            curs.executemany(
+                "INSERT INTO group_members(group_id, position, member_id, "
+                "member_name, member_key, is_lead) VALUES (?, ?, "
+                "(SELECT id FROM artists WHERE name_key = ?), ?, ?, ?)",
+                [
+                    (
+                        group_id, position, normalize_name(artist.name),
+                        artist.name, normalize_name(artist.name),
+                        position == 0
+                    )
+                    for position, artist in enumerate(artists)
+                ]
             )
-            self._conn.commit()
-            return True
-        except sqlite3.ProgrammingError as err:
-            self.log(err, fg='red')
 
-    def _store_artist(self, row):
-        """Store the results."""
-        curs = self._get_db()
-        try:
+    def _get_member_results(self, name):
+        """Get each member of a stored group, with their row if they have one.
+
+        Returns ``(Artist, DBRow or None)`` pairs in order, from one query.
+        """
+        with self._lock:
+            curs = self._get_db()
             curs.execute(
-                """
-                INSERT INTO artists(
-                    name,
-                    spotify_id,
-                    wiki_url,
-                    lastfm_url,
-                    context,
-                    gender,
-                    is_group,
-                    lead_gender,
-                    nonbinary_count,
-                    female_count,
-                    male_count,
-                    unknown_count,
-                    member_names
+                "SELECT member_name, " + MEMBER_ARTIST_COLUMNS + " "
+                "FROM artists AS band "
+                "JOIN group_members ON group_members.group_id = band.id "
+                "LEFT JOIN artists AS member "
+                "ON member.id = group_members.member_id "
+                "WHERE band.name_key = ? ORDER BY position",
+                (normalize_name(name),)
+            )
+            rows = curs.fetchall()
+        return [
+            (
+                self.get_artist_obj_from_name(row[0]),
+                self._make_db_row(row[1:]) if row[1] is not None else None
+            )
+            for row in rows
+        ]
+
+    def _get_playlist_snapshot_id(self, playlist_id):
+        """Get the snapshot of a playlist last looked up, if it has been.
+
+        As with ``_get_known_name_keys``, there's none to go by if forcing.
+        """
+        if self._force_fetch:
+            return None
+        with self._lock:
+            curs = self._get_db()
+            curs.execute(
+                "SELECT snapshot_id FROM playlists WHERE id = ?",
+                (playlist_id,)
+            )
+            row = curs.fetchone()
+        return row[0] if row else None
+
+    def _get_playlist_keys(self, playlist_id, snapshot_id):
+        """Get the names on a stored snapshot of a playlist."""
+        if snapshot_id is None:
+            return set()
+        with self._lock:
+            curs = self._get_db()
+            curs.execute(
+                "SELECT name_key FROM playlist_artists "
+                "WHERE playlist_id = ? AND snapshot_id = ?",
+                (playlist_id, snapshot_id)
+            )
+            return {row[0] for row in curs.fetchall()}
+
+    def _store_playlist_artists(self, playlist_id, snapshot_id, position,
+                                artists):
+        """Store the artists on a snapshot of a playlist, from ``position``."""
+        with self._lock:
+            curs = self._get_db()
+            curs.executemany(
+                "INSERT OR REPLACE INTO playlist_artists(playlist_id, "
+                "snapshot_id, position, spotify_id, name, name_key) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        playlist_id, snapshot_id, at, artist.spotify_id,
+                        artist.name, normalize_name(artist.name)
+                    )
+                    for at, artist in enumerate(artists, position)
+                ]
+            )
+            self._commit_later()
+
+    def _store_playlist_snapshot(self, playlist_id, snapshot_id):
+        """Mark a playlist's snapshot as looked up, dropping older ones."""
+        with self._lock:
+            curs = self._get_db()
+            curs.execute(
+                "DELETE FROM playlist_artists "
+                "WHERE playlist_id = ? AND snapshot_id != ?",
+                (playlist_id, snapshot_id)
+            )
+            curs.execute(
+                "INSERT INTO playlists(id, snapshot_id, name, description) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET "
+                "snapshot_id = excluded.snapshot_id, name = excluded.name, "
+                "description = excluded.description, "
+                "updated_at = CURRENT_TIMESTAMP",
+                (
+                    playlist_id, snapshot_id, self._playlist_name,
+                    self._playlist_description
                 )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                row
             )
-            self._conn.commit()
-            return True
-        except sqlite3.ProgrammingError as err:
-            self.log(err, fg='red')
+            self._commit()
+
+    def _finish_batch(self, snapshot):
+        """Store the batch's playlist snapshot, if it was all looked up."""
+        if snapshot is None:
+            return
+        if self._batch_incomplete:
+            self.log(
+                u"Some artists couldn't be looked up, so the playlist will "
+                u"be checked again next time.", fg="yellow"
+            )
+            self._unstored_snapshot = snapshot
+            return
+        self._store_playlist_snapshot(*snapshot)
+
+    def _start_run(self):
+        """Start a run of the current source, unless it's the one running.
+
+        Every artist reported on from here is remembered as part of it. A
+        batch known to be empty (a playlist unchanged) isn't a run at all.
+        """
+        if self._fetched_artists_to_process == []:
+            return None
+        source = self._batch_source
+        with self._lock:
+            if self._run_id is not None and self._run_source == source:
+                return self._run_id
+            curs = self._get_db()
+            curs.execute("INSERT INTO runs(source) VALUES (?)", (source,))
+            self._run_id = curs.lastrowid
+            self._run_source = source
+            self._commit_later()
+        return self._run_id
+
+    def _set_batch_source(self, source, resumable=True):
+        """Say what the batch is from; only resumable ones are checkpointed."""
+        self._batch_source = source
+        self._checkpoint_source = source if resumable else None
 
     def _set_offset(self, offset):
-        """Set the offset."""
-        curs = self._get_db()
-        curs.execute("INSERT INTO meta(offset) VALUES (?)", (offset,))
-        self._conn.commit()
+        """Set the offset to resume the current source from."""
+        if self._checkpoint_source is None:  # not one that resumes by offset
+            return
+        with self._lock:
+            curs = self._get_db()
+            curs.execute(
+                "INSERT INTO checkpoints(source, offset) VALUES (?, ?) "
+                "ON CONFLICT(source) DO UPDATE SET offset = excluded.offset, "
+                "updated_at = CURRENT_TIMESTAMP",
+                (self._checkpoint_source, offset)
+            )
+            self._offset = offset
+            self._uncommitted_checkpoints[self._checkpoint_source] = offset
+            self._commit_later()
 
     def _get_offset(self):
-        """Get the last offset."""
-        curs = self._get_db()
-        curs.execute("SELECT offset FROM meta ORDER BY timestamp DESC LIMIT 1")
-        offset = curs.fetchone()
-        return offset[0] if offset else 0
+        """Get the offset to resume the current source from."""
+        if self._checkpoint_source is None:
+            return 0
+        with self._lock:
+            curs = self._get_db()
+            curs.execute(
+                "SELECT offset FROM checkpoints WHERE source = ?",
+                (self._checkpoint_source,)
+            )
+            offset = curs.fetchone()
+            self._offset = offset[0] if offset else 0
+        return self._offset
+
+    def _get_checked(self, name):
+        """Get what's stored of a name, and its miss (from memory if we can).
+
+        Returns ``(DBRow, (reason, retry_after))``, either None if there
+        isn't one.
+        """
+        name_key = normalize_name(name)
+        with self._lock:
+            checked = self._rows.get(name_key)
+            if checked is not None:
+                return checked
+            curs = self._get_db()
+            curs.execute(
+                "SELECT " + ARTIST_COLUMNS + " FROM artists "
+                "WHERE name_key = ?",
+                (name_key,)
+            )
+            row = curs.fetchone()
+            curs.execute(
+                "SELECT reason, retry_after FROM misses WHERE name = ?",
+                (name_key,)
+            )
+            checked = (
+                self._make_db_row(row) if row else None, curs.fetchone()
+            )
+            self._rows.put(name_key, checked)
+        return checked
 
     def _checked_result(self, name):
         """Check to see if we already got this."""
-        curs = self._get_db()
-        curs.execute(
-            "SELECT * FROM artists WHERE name = ?", (name,)
-        )
-        row = curs.fetchone()
-        if row:
-            # item 0 is the ID, discard
-            result = DBRow(
-                Artist(*row[1:5]),
-                row[5], row[6], row[7], row[8],
-                MemberResults(*row[9:])
+        return self._get_checked(name)[0]
+
+    def _make_db_row(self, row):
+        """Make a DBRow from the ``ARTIST_COLUMNS`` of an artists row."""
+        # item 0 is the ID, discard
+        return DBRow(
+            Artist(*row[1:5]),
+            row[5], row[6], row[7], row[8],
+            MemberResults(*row[9:])
+        )
+
+    def _get_known_name_keys(self, names):
+        """Get which of the names needn't be looked up again, in one query.
+
+        That's those with a gender (or group) stored, or a miss we're still
+        backing off from; as with ``_get_known_result``, none if forcing.
+        """
+        if self._force_fetch:
+            return set()
+        keys = list({normalize_name(name) for name in names})
+        marks = u", ".join([u"?"] * len(keys))
+        with self._lock:
+            curs = self._get_db()
+            curs.execute(
+                "SELECT name_key FROM artists WHERE name_key IN ({0}) "
+                "AND (gender IS NOT NULL OR is_group) "
+                "UNION SELECT name FROM misses WHERE name IN ({0}) "
+                "AND retry_after > ?".format(marks),
+                keys + keys + [time.time()]
             )
-            return result
+            return set([row[0] for row in curs.fetchall()])
+
+    def _get_miss(self, name):
+        """Get why and until when we aren't retrying this name, if so."""
+        miss = self._get_checked(name)[1]
+        if miss is not None and miss[1] > time.time():
+            return miss
+        return None
+
+    def _store_miss(self, name, reason):
+        """Remember a failed lookup, backing off further each time."""
+        with self._lock:
+            self._rows.discard(normalize_name(name))
+            curs = self._get_db()
+            curs.execute(
+                "SELECT attempts FROM misses WHERE name = ?",
+                (normalize_name(name),)
+            )
+            row = curs.fetchone()
+            attempts = (row[0] if row else 0) + 1
+            backoff = min(
+                self._miss_backoff * 2 ** (attempts - 1),
+                self._max_miss_backoff
+            )
+            curs.execute(
+                "INSERT OR REPLACE INTO misses(name, reason, attempts, "
+                "retry_after) VALUES (?, ?, ?, ?)",
+                (
+                    normalize_name(name), reason, attempts,
+                    time.time() + backoff
+                )
+            )
+            self._commit_later()
+
+    def _delete_miss(self, name):
+        """Forget a failed lookup."""
+        with self._lock:
+            self._rows.discard(normalize_name(name))
+            curs = self._get_db()
+            curs.execute(
+                "DELETE FROM misses WHERE name = ?", (normalize_name(name),)
+            )
+            self._commit_later()
+
+    def purge_misses(self):
+        """Forget all the failed lookups, so they're all tried again."""
+        with self._lock:
+            self._rows.clear()
+            curs = self._get_db()
+            curs.execute("DELETE FROM misses")
+            self._commit()
+            return curs.rowcount
 
     def _get_headers(self, extra_headers=None):
         """Get UA headers, and add any extras."""
@@ -218,18 +764,39 @@ class Genderifier(object):
         headers.update(extra_headers)
         return headers
 
-    def _wiki_get_info(self, soup):
-        """Get the 'infobox' rows from the RHS of wiki page."""
-        info_rows = soup.select('table.infobox tr th[scope="row"]')
-        return info_rows
+    def _get(self, url, **kwargs):
+        """GET a URL through the pooled session."""
+        return self._fetcher.get(url, **kwargs)
+
+    def _wiki_get(self, url):
+        """GET a Wikipedia page, or as much of it as we need if streaming."""
+        if not self._stream:
+            return self._get(url)
+        return self._fetcher.get_streamed(
+            url,
+            WikiStreamWatcher(self._stream_max_paragraphs),
+            max_bytes=self._stream_max_bytes,
+        )
+
+    def _make_soup(self, text, strainer=None):
+        """Parse a fetched page, just the parts the strainer lets through."""
+        return make_soup(
+            text, self._parser, strainer if self._strain else None
+        )
+
+    def _wiki_make_page(self, text):
+        """Parse a fetched Wikipedia page."""
+        return WikiPage(self._make_soup(text, WIKI_STRAINER))
 
-    def _wiki_is_artist_page(self, soup):
-        """Determine if a soup is about an artist."""
+    def _lastfm_make_page(self, text):
+        """Parse a fetched Last.FM wiki page."""
+        return LastFMPage(self._make_soup(text, LASTFM_STRAINER))
+
+    def _wiki_is_artist_page(self, page):
+        """Determine if a page is about an artist."""
         is_artist = set(
             ['Genres', 'Labels', 'Instruments']
-        ) & set(
-            [th.text for th in self._wiki_get_info(soup)]
-        )
+        ) & set(page.infobox_labels)
         if is_artist:
             self.log("This appears to be an artist page.")
         else:
@@ -237,11 +804,11 @@ class Genderifier(object):
 
         return is_artist
 
-    def _wiki_is_disambiguation(self, soup):
+    def _wiki_is_disambiguation(self, page):
         """Return True if this a disambiguation page."""
         artist = self._current_artist_stack[-1]
         name = artist.name.lower()
-        text = soup.text.lower()
+        text = page.text_lower
         if u"{} may refer to:".format(name) in text:
             return True
         if u"{} may also refer to:".format(name) in text:
@@ -251,91 +818,109 @@ class Genderifier(object):
         self.log("Not a disambiguation page...")
         return False
 
-    def _wiki_get_disambiguated_artist_soup(self, soup):
-        """Get the actual soup from the disambiguation page."""
-        artist = self._current_artist_stack[-1]
+    def _wiki_get_band_url(self, page):
+        """Get the URL of the one band listed on a disambiguation page."""
         links = [
-            link for link in soup.find_all('a')
-            if 'band' in link.text.lower()  # TODO: use regex \b for better
+            (text, href) for text, href in page.links
+            if 'band' in text.lower()  # TODO: use regex \b for better
         ]
         if len(links) > 1:
             self.log(
                 u"Too many choices!\n * {}".format(
                     u"\n * ".join([
-                        link.text for link in links
+                        text for text, href in links
                     ])
                 ),
                 fg="red"
             )
         elif len(links) == 1:
-            url = u"https://en.wikipedia.org{}".format(links[0]['href'])
+            return u"https://en.wikipedia.org{}".format(links[0][1])
+
+    def _wiki_get_disambiguated_artist_page(self, page):
+        """Get the actual page from the disambiguation page."""
+        artist = self._current_artist_stack[-1]
+        url = self._wiki_get_band_url(page)
+        if url is not None:
             self.log(u"Trying Wikipedia URL {}...".format(url))
-            req = requests.get(url)
-            text = req.text
-            soup = BeautifulSoup(text, "html.parser")
-            if self._wiki_is_artist_page(soup):
+            req = self._wiki_get(url)
+            page = self._wiki_make_page(req.text)
+            if self._wiki_is_artist_page(page):
                 self._current_artist_stack[-1] = Artist(
                     artist.name, artist.spotify_id, url, artist.lastfm_url
                 )
-                return soup
+                return page
         return None  # TODO FIXME
 
-    def _wiki_find_disambiguation(self, soup):
-        """Try and find the page that is the disambiguation."""
+    def _wiki_get_disambiguation_url(self, page):
+        """Get the URL of the disambiguation page linked from this one."""
         artist = self._current_artist_stack[-1]
-        if u"For other uses, see {}".format(artist.name) in soup.text:
+        if u"For other uses, see {}".format(artist.name) in page.text:
             # now find the link with (disambiguation) after it...?
             links = [
-                link for link in soup.find_all('a')
-                if link.text == u"{} (disambiguation)".format(artist.name)
+                href for text, href in page.links
+                if text == u"{} (disambiguation)".format(artist.name)
             ]
             if len(links):
-                url = u"https://en.wikipedia.org{}".format(links[0]['href'])
-                self.log(u"Trying Wikipedia URL {}...".format(url))
-                req = requests.get(url)
-                text = req.text
-                soup = BeautifulSoup(text, "html.parser")
-                if self._wiki_is_disambiguation(soup):
-                    soup = self._wiki_get_disambiguated_artist_soup(soup)
-                    return soup
-                self.log(u"Can't disambiguate at {}".format(url), fg="red")
+                return u"https://en.wikipedia.org{}".format(links[0])
 
-    def _wiki_get_artist_soup(self):
+    def _wiki_find_disambiguation(self, page):
+        """Try and find the page that is the disambiguation."""
+        url = self._wiki_get_disambiguation_url(page)
+        if url is not None:
+            self.log(u"Trying Wikipedia URL {}...".format(url))
+            req = self._wiki_get(url)
+            page = self._wiki_make_page(req.text)
+            if self._wiki_is_disambiguation(page):
+                page = self._wiki_get_disambiguated_artist_page(page)
+                return page
+            self.log(u"Can't disambiguate at {}".format(url), fg="red")
+
+    def _wiki_get_artist_url(self, artist):
+        """Get the URL of the page we'd expect the artist to be on."""
+        return artist.wiki_url or u"https://en.wikipedia.org/wiki/{}".format(
+            artist.name.replace(' ', '_')
+        )
+
+    def _wiki_is_redirect(self, page):
+        """Return True if the page was redirected from the artist's name."""
+        artist = self._current_artist_stack[-1]
+        if u"Redirected from {}".format(artist.name) in page.text:  # FIXME
+            # may actually be fine, e.g. XXXTENTACION == XXXTentacion  FIXME
+            self.log("Page redirects...", fg="red")
+            return True
+        return False
+
+    def _wiki_get_artist_page(self):
         """Try to get the artist page, few options to check..."""
         artist = self._current_artist_stack[-1]
         name = artist.name
-        url = artist.wiki_url or u"https://en.wikipedia.org/wiki/{}".format(
-            name.replace(' ', '_')
-        )
+        url = self._wiki_get_artist_url(artist)
         self.log(u"Trying Wikipedia URL {}...".format(url))
-        req = requests.get(url)
-        text = req.text
-        soup = BeautifulSoup(text, "html.parser")
+        req = self._wiki_get(url)
+        page = self._wiki_make_page(req.text)
         continue_checks = True
 
         self._current_artist_stack[-1] = Artist(  # update with current url
             name, artist.spotify_id, url, artist.lastfm_url
         )
-        if u"Redirected from {}".format(name) in soup.text:  # TODO FIXME
-            # may actually be fine, e.g. XXXTENTACION == XXXTentacion  FIXME
-            self.log("Page redirects...", fg="red")
+        if self._wiki_is_redirect(page):
             continue_checks = False
 
-        if continue_checks and self._wiki_is_disambiguation(soup):
-            soup = self._wiki_get_disambiguated_artist_soup(soup)
-            if soup is None:
+        if continue_checks and self._wiki_is_disambiguation(page):
+            page = self._wiki_get_disambiguated_artist_page(page)
+            if page is None:
                 self.log(u"Can't disambiguate at {}".format(url), fg="red")
                 continue_checks = False
 
         if continue_checks:
-            is_artist_page = self._wiki_is_artist_page(soup)
+            is_artist_page = self._wiki_is_artist_page(page)
             if is_artist_page:
-                return soup
+                return page
             else:  # try some tricks
-                old_soup = soup  # to restore state later...
-                soup = self._wiki_find_disambiguation(soup)
-                if soup is None:
-                    soup = old_soup
+                old_page = page  # to restore state later...
+                page = self._wiki_find_disambiguation(page)
+                if page is None:
+                    page = old_page
                 # well, fail here... what else can we try?
 
         # Failed all wiki tries
@@ -346,156 +931,316 @@ class Genderifier(object):
             fg='red'
         )
 
-    def _wiki_is_group(self, soup):
-        """Determine if this soup is an artist page..."""
-        info_rows_texts = [th.text for th in self._wiki_get_info(soup)]
-        try:
-            info_rows_texts.index('Members')
+    def _wiki_is_group(self, page):
+        """Determine if this page is an artist page..."""
+        if page.members is not None:
             self.log("This is a group - it has a members section")
             return True
-        except ValueError:
-            self.log("This is not a group - no members section")
-            return False
+        self.log("This is not a group - no members section")
+        return False
 
-    def _wiki_get_group_members(self, soup):
+    def _wiki_get_group_members(self, page):
         """Get the group members - return list of Artists."""
-        results = []
-        info_rows = self._wiki_get_info(soup)
-        info_rows_texts = [th.text for th in info_rows]
-        members_ix = info_rows_texts.index('Members')
-        cell = info_rows[members_ix].parent.find('td')
-        members = cell.find_all('li')
-        if not members:
-            members = [
-                el for el in list(cell.children)
-                if el not in ('<br/>', '\n')
-            ]
-        if not members:
+        if not page.members:
             self.log("No group members found!", fg="red")
-        for member in members:
-            url = None
-            try:
-                name = member.text.strip()
-                link = member.find('a')
-                if link:
-                    url = u"https://en.wikipedia.org{}".format(link['href'])
-            except AttributeError:
-                name = member.strip()
-            results.append(Artist(
-                name=name, spotify_id=None, wiki_url=url, lastfm_url=None
-            ))
-        return results
+        return [
+            Artist(
+                name=name, spotify_id=None, lastfm_url=None,
+                wiki_url=(
+                    u"https://en.wikipedia.org{}".format(href)
+                    if href else None
+                )
+            )
+            for name, href in page.members
+        ]
 
-    def _wiki_get_bio(self, soup):
-        """Return the interesting part of a wiki aritst page soup."""
-        paras = soup.find_all('p')
-        paras_text = ' '.join([p.get_text() for p in paras])
-        return paras_text
+    def _wiki_get_bio(self, page):
+        """Return the interesting part of a wiki aritst page."""
+        return page.bio
 
-    def _lastfm_get_artist_soup(self):
+    def _lastfm_get_artist_page(self):
         """Try to get the artist page, few options to check..."""
         artist = self._current_artist_stack[-1]
         name = artist.name
-        url = artist.lastfm_url or (
-            u"https://www.last.fm/music/{}/+wiki".format(
-                name.replace(' ', '+')
-            )
-        )
+        url = self._lastfm_get_artist_url(artist)
         self.log(u"Trying Last.FM URL {}...".format(url))
-        req = requests.get(url)
+        req = self._get(url)
         if req.status_code == 404:
             self.log("The artist was not found.")
             return None
-        text = req.text
-        soup = BeautifulSoup(text, "html.parser")
+        page = self._lastfm_make_page(req.text)
 
         self._current_artist_stack[-1] = Artist(  # update with current url
             name, artist.spotify_id, artist.wiki_url, url
         )
-        return soup
+        return page
 
-    def _lastfm_get_info(self, soup):
-        """Get the 'factbox' rows from the RHS of lastfm wiki page."""
-        info_rows = soup.select('li.factbox-item')
-        return info_rows
+    def _lastfm_get_artist_url(self, artist):
+        """Get the URL of the Last.FM wiki page for the artist."""
+        return artist.lastfm_url or (
+            u"https://www.last.fm/music/{}/+wiki".format(
+                artist.name.replace(' ', '+')
+            )
+        )
 
-    def _lastfm_is_group(self, soup):
-        """Determine if this soup is an artist page..."""
-        info_rows_texts = [
-            li.find('h4').text for li in self._lastfm_get_info(soup)
-        ]
-        try:
-            info_rows_texts.index('Members')
+    def _lastfm_is_group(self, page):
+        """Determine if this page is an artist page..."""
+        if page.members is not None:
             self.log("This is a group - it has a members section")
             return True
-        except ValueError:
-            self.log("This is not a group - no members section")
-            return False
+        self.log("This is not a group - no members section")
+        return False
 
-    def _lastfm_get_group_members(self, soup):
+    def _lastfm_get_group_members(self, page):
         """Get the group members - return list of Artists."""
-        results = []
-        info_rows = self._lastfm_get_info(soup)
-        info_rows_texts = [
-            li.find('h4').text for li in self._lastfm_get_info(soup)
-        ]
-        members_ix = info_rows_texts.index('Members')
-        ul = info_rows[members_ix].find('ul')
-        members = ul.find_all('li')
-        if not members:
+        if not page.members:
             self.log("No group members found!", fg="red")
-        for member in members:
-            url = None
-            try:
-                link = member.find('a')
-                name = link.text.strip()
-                if link:
-                    url = u"https://www.last.fm{}/+wiki".format(link['href'])
-            except AttributeError:
-                name = member.find('span').text.strip()
-            results.append(Artist(
-                name=name, spotify_id=None, wiki_url=None, lastfm_url=url
-            ))
+        return [
+            Artist(
+                name=name, spotify_id=None, wiki_url=None,
+                lastfm_url=(
+                    u"https://www.last.fm{}/+wiki".format(href)
+                    if href else None
+                )
+            )
+            for name, href in page.members
+        ]
+
+    def _lastfm_get_bio(self, page):
+        """Return the interesting part of a wiki aritst page."""
+        return page.bio
+
+    def _wikiapi_get_title(self, artist):
+        """Get the title of the page we'd expect the artist to be on."""
+        if artist.wiki_url:
+            return self._wikiapi_get_url_title(artist.wiki_url)
+        return artist.name
+
+    def _wikiapi_get_url_title(self, url):
+        """Get the title of the page at a Wikipedia URL."""
+        return unquote(url.rsplit('/wiki/', 1)[-1]).replace('_', ' ')
+
+    def _wikiapi_get_query_params(self, titles):
+        """Get the query for where titles lead, and if they disambiguate."""
+        return {
+            'action': 'query',
+            'titles': '|'.join(titles),
+            'redirects': 1,
+            'prop': 'pageprops',
+            'ppprop': 'disambiguation',
+            'format': 'json',
+            'formatversion': 2,
+        }
+
+    def _wikiapi_read_titles(self, titles, resp):
+        """Work out which page each title ends up on, from the query."""
+        query = resp.get('query', {})
+        normalized = {
+            move['from']: move['to'] for move in query.get('normalized', [])
+        }
+        redirects = {
+            move['from']: move['to'] for move in query.get('redirects', [])
+        }
+        pages = {page['title']: page for page in query.get('pages', [])}
+        results = {}
+        for title in titles:
+            redirected_from = normalized.get(title, title)
+            final = redirects.get(redirected_from, redirected_from)
+            page = pages.get(final, {})
+            results[title] = WikiTitle(
+                title=final,
+                # a redirect that only changes case (XXXTENTACION ->
+                # XXXTentacion) is still the same artist
+                redirected=(
+                    normalize_name(redirected_from) != normalize_name(final)
+                ),
+                missing=not page or page.get('missing', False) or (
+                    page.get('invalid', False)
+                ),
+                disambiguation='disambiguation' in page.get('pageprops', {}),
+            )
         return results
 
-    def _lastfm_get_bio(self, soup):
-        """Return the interesting part of a wiki aritst page soup."""
-        paras = soup.select('div.wiki-content p')
-        if paras is None:
+    def _wikiapi_get_titles(self, titles):
+        """Look up where the titles lead, up to 50 a request."""
+        found = {}
+        for title in titles:
+            if '|' in title:  # can't be a title, and would split the query
+                found[title] = WikiTitle(title, False, True, False)
+        titles = [
+            title for title in titles
+            if title not in found and title not in self._wiki_titles
+        ]
+        for start in range(0, len(titles), WIKI_API_MAX_TITLES):
+            chunk = titles[start:start + WIKI_API_MAX_TITLES]
+            req = self._get(
+                self._wiki_api_url,
+                params=self._wikiapi_get_query_params(chunk)
+            )
+            found.update(self._wikiapi_read_titles(chunk, req.json()))
+        for title, info in found.items():
+            self._wiki_titles.put(title, info)
+        return found
+
+    def _wikiapi_get_title_info(self, title):
+        """Get where a title leads, from the batch's lookup if it was in it."""
+        info = self._wiki_titles.get(title)
+        if info is None:
+            info = self._wikiapi_get_titles([title])[title]
+        return info
+
+    def _wikiapi_get_parse_params(self, title):
+        """Get the query for the rendered content of a page."""
+        return {
+            'action': 'parse',
+            'page': title,
+            'prop': 'text',
+            'disableeditsection': 1,
+            'disablelimitreport': 1,
+            'disabletoc': 1,
+            'format': 'json',
+            'formatversion': 2,
+        }
+
+    def _wikiapi_read_page(self, title, resp):
+        """Make a page of the parsed content, None if there wasn't any."""
+        if resp.get('error'):
+            self.log(
+                u"Can't get {}: {}".format(title, resp['error'].get('info')),
+                fg="red"
+            )
             return None
-        paras_text = ' '.join([p.get_text() for p in paras])
-        return paras_text
+        return WikiPage(self._make_soup(resp['parse']['text']))
+
+    def _wikiapi_get_page(self, title):
+        """Get the content of a page through the API."""
+        self.log(u"Trying Wikipedia API for {}...".format(title))
+        req = self._get(
+            self._wiki_api_url, params=self._wikiapi_get_parse_params(title)
+        )
+        return self._wikiapi_read_page(title, req.json())
+
+    def _wikiapi_get_url(self, title):
+        """Get the URL of the page with this title."""
+        return u"https://en.wikipedia.org/wiki/{}".format(
+            title.replace(' ', '_')
+        )
+
+    def _wikiapi_use_page(self, title):
+        """Note the page we're using for the current artist."""
+        artist = self._current_artist_stack[-1]
+        self._current_artist_stack[-1] = Artist(
+            artist.name, artist.spotify_id, self._wikiapi_get_url(title),
+            artist.lastfm_url
+        )
+
+    def _wikiapi_get_disambiguated_artist_page(self, page):
+        """Get the actual page from the disambiguation page."""
+        url = self._wiki_get_band_url(page)
+        if url is not None:
+            found = self._wikiapi_get_title_info(
+                self._wikiapi_get_url_title(url)
+            )
+            page = None if found.missing else self._wikiapi_get_page(
+                found.title
+            )
+            if page is not None and self._wiki_is_artist_page(page):
+                self._wikiapi_use_page(found.title)
+                return page
+        return None
+
+    def _wikiapi_get_artist_page(self):
+        """Get the artist page through the API, few options to check..."""
+        artist = self._current_artist_stack[-1]
+        found = self._wikiapi_get_title_info(self._wikiapi_get_title(artist))
+        if found.missing:
+            self.log("The artist was not found.")
+            return None
+        if found.redirected:
+            self.log("Page redirects...", fg="red")
+            return None
+
+        page = self._wikiapi_get_page(found.title)
+        if page is not None and found.disambiguation:
+            page = self._wikiapi_get_disambiguated_artist_page(page)
+            if page is not None:
+                return page
+        elif page is not None and self._wiki_is_artist_page(page):
+            self._wikiapi_use_page(found.title)
+            return page
+        # like the 'wiki' source, a hatnote's disambiguation page isn't
+        # followed through to a result
+
+        self.log(
+            u"The page probably isn't about a musician... title was {}"
+            u"".format(found.title),
+            fg='red'
+        )
+
+    # The API gives the same article HTML, so it's read the same way.
+    _wikiapi_is_group = _wiki_is_group
+    _wikiapi_get_group_members = _wiki_get_group_members
+    _wikiapi_get_bio = _wiki_get_bio
+
+    def _clear_prefetched(self):
+        """Forget what was looked up up front for the last batch."""
+        self._wiki_titles = LRUCache(PREFETCH_CACHE_SIZE)
+
+    def _prefetch(self, sources, artists):
+        """Look up what the sources can for many artists at once, up front."""
+        if 'wikiapi' in sources:
+            try:
+                self._wikiapi_get_titles(list(dict.fromkeys([
+                    self._wikiapi_get_title(artist) for artist in artists
+                ])))
+            except FetchError as error:  # each tried again in its turn
+                self.log(error, fg='red')
 
     def _get_gender_and_context(self, corpus):
         """Parse corpus for a person."""
-        gender = None
-        context = None
-        first_pronoun = None
-        words = corpus.split(' ')
-        for ix, word in enumerate(words):
-            word = word.lower()
-            word = re.sub(r'[^\w]', '', word)
-            if word in [
-                'his', 'her', 'their', 'he', 'she', 'they', 'them', 'him'
-            ]:
-                first_pronoun = word
-                context = " ".join(words[ix - 5:ix + 5])
-                break
-        gender = PRONOUN_MAP.get(first_pronoun, None)
-        return gender, context
-
-    def get_playlist(self, username, playlist_id):
-        """Get the playlist JSON."""
-        url = (
-            "https://api.spotify.com/v1/users/{user_id}"
-            "/playlists/{playlist_id}"
-        ).format(user_id=username, playlist_id=playlist_id)
-        headers = {
+        return get_gender_and_context(corpus, self._legacy_context)
+
+    def _score_gender_and_context(self, corpus):
+        """Weigh up all the pronouns, False if not sure enough to store."""
+        artist = self._current_artist_stack[-1]
+        gender, confidence, contexts = score_gender(corpus, artist.name)
+        if gender is not None and confidence < self._min_confidence:
+            self.log(
+                u"Only {:.0%} sure {} is {}, trying elsewhere...".format(
+                    confidence, artist.name, gender
+                ),
+                fg="red"
+            )
+            return False
+        return gender, u" ... ".join(contexts) or None
+
+    def _get_spotify_headers(self):
+        """Get the headers for a Spotify API request."""
+        return self._get_headers({
             'Authorization': "Bearer {}".format(self._spotify_token),
             'Accept': 'application/json',
             'Content-Type': 'application/json',
-        }
-        req = requests.get(url, headers=self._get_headers(headers))
+        })
+
+    def _get_playlist_url(self, username, playlist_id):
+        """Get the Spotify API URL of a playlist."""
+        return (
+            "https://api.spotify.com/v1/users/{user_id}"
+            "/playlists/{playlist_id}"
+        ).format(user_id=username, playlist_id=playlist_id)
+
+    def _get_playlist_params(self, fields=None):
+        """Get the query parameters for a playlist, or just some fields."""
+        return {'fields': fields} if fields else None
+
+    def get_playlist(self, username, playlist_id, fields=None):
+        """Get the playlist JSON (or just the ``fields`` asked for)."""
+        url = self._get_playlist_url(username, playlist_id)
+        req = self._get(
+            url,
+            params=self._get_playlist_params(fields),
+            headers=self._get_spotify_headers()
+        )
         resp = req.json()
         return resp
 
@@ -526,7 +1271,12 @@ class Genderifier(object):
             lead,
             members
         )
-        self._store_artist(row)
+        with self._lock:  # so a group is never seen without its members
+            artist_id = self._store_artist(row)
+            if artist_id is not None:
+                if is_group:
+                    self._store_group_members(artist_id, members.artists)
+                self._commit_later()  # both in the one commit
         return DBRow(
                 artist,
                 context, gender, is_group, lead,
@@ -573,50 +1323,134 @@ class Genderifier(object):
     def set_artist_batch_from_spotify_search(self, offset=None):  # nocov
         """Get a batch of artists from Spotify search API, set to process."""
         self._fetched_artists_to_process = []
+        self._set_batch_source(SEARCH_CHECKPOINT)
         if offset is None:
             offset = self._get_offset()
         else:
             self._set_offset(offset)
 
         self.log("Starting at offset = {}".format(offset), fg='blue')
-        url = "https://api.spotify.com/v1/search"
-        query = {
-            'q': 'year:0000-9999',
+        req = self._get(
+            SPOTIFY_SEARCH_URL,
+            params=self._get_search_query(offset),
+            headers=self._get_spotify_headers()
+        )
+        self._set_artist_batch_from_search_response(req.json())
+
+    def _get_search_query(self, offset):
+        """Get the Spotify search API query for a page of artists."""
+        return {
+            'q': SEARCH_CHECKPOINT.split(':', 1)[1],
             'type': 'artist',
             'limit': min([50, self._batch_limit]),
             'offset': offset,
         }
-        headers = {
-            'Authorization': "Bearer {}".format(self._spotify_token),
-            'Accept': 'application/json',
-            'Content-Type': 'application/json',
-        }
-        req = requests.get(
-            url, params=query, headers=self._get_headers(headers)
+
+    def _set_artist_batch_from_search_response(self, resp):
+        """Set the artists from a page of Spotify search results to process."""
+        self._fetched_artists_to_process.extend(
+            self._get_artists_from_search_response(resp)
         )
-        resp = req.json()
+
+    def _get_artists_from_search_response(self, resp):
+        """Get the artists from a page of Spotify search results."""
         try:
-            artists_json = resp['artists']['items']
-            for artist in artists_json:
-                name = artist['name']
-                id_ = artist['id']
-                self._fetched_artists_to_process.append(
-                    Artist(
-                        name=name, spotify_id=id_, wiki_url=None,
-                        lastfm_url=None
-                    )
+            return [
+                Artist(
+                    name=artist['name'], spotify_id=artist['id'],
+                    wiki_url=None, lastfm_url=None
                 )
+                for artist in resp['artists']['items']
+            ]
         except KeyError:
-            try:
-                error = resp['error']['message']
-                raise RuntimeError(error)
-            except KeyError:
-                raise RuntimeError("Response was weird: {}".format(resp))
+            raise self._get_response_error(resp)
+
+    def _get_search_page(self, offset):
+        """Get the artists on the page of Spotify search results at offset."""
+        req = self._get(
+            SPOTIFY_SEARCH_URL,
+            params=self._get_search_query(offset),
+            headers=self._get_spotify_headers()
+        )
+        return self._get_artists_from_search_response(req.json())
+
+    def set_artist_stream_from_spotify_search(self, offset=None,
+                                              ahead=SEARCH_PAGES_AHEAD):
+        """Set every artist from the Spotify search API on, to process.
+
+        A thread keeps up to ``ahead`` pages of results fetched, so the
+        lookups never wait on Spotify. The offset only moves on as artists
+        are done, so the pages fetched ahead are fetched again if we stop.
+        """
+        self._set_batch_source(SEARCH_CHECKPOINT)
+        if offset is None:
+            offset = self._get_offset()
+        else:
+            self._set_offset(offset)
+
+        self.log("Starting at offset = {}".format(offset), fg='blue')
+        self._fetched_artists_to_process = self._iter_search_artists(
+            offset, ahead
+        )
+
+    def _iter_search_artists(self, offset, ahead):
+        """Yield the artists from the search pages a thread fetches ahead."""
+        for page in PagesAhead(self._get_search_page, offset, ahead):
+            for artist in page:
+                yield artist
 
     def set_artists_batch_from_spotify_public_playlist(
         self, url=None, user_id=None, playlist_id=None
     ):
-        """Set the batch of artists to be from one public Spotify playlist."""
+        """Set the batch of artists to be from one public Spotify playlist.
+
+        If the playlist is as it was when last looked up, the batch is
+        empty; if it's changed, only the artists added since are in it.
+        """
+        user_id, playlist_id = self._get_playlist_ids(
+            url, user_id, playlist_id
+        )
+        # read through in full each time, so there's no offset to resume
+        self._set_batch_source(
+            u"playlist:{}".format(playlist_id), resumable=False
+        )
+        self._playlist_id = playlist_id
+        snapshot_id = self._get_playlist_snapshot_id(playlist_id)
+        if self._is_playlist_unchanged(
+            self.get_playlist(user_id, playlist_id, PLAYLIST_SNAPSHOT_FIELDS),
+            snapshot_id
+        ):
+            return
+        known = self._get_playlist_keys(playlist_id, snapshot_id)
+        resp = self.get_playlist(user_id, playlist_id)
+        self._set_artist_batch_from_playlist_response(resp, playlist_id, known)
+
+    def set_artist_stream_from_import(self, artists):
+        """Set imported artists (from any iterable) to process, as they come.
+
+        Names already looked up are skipped a chunk at a time, so an import
+        is resumed by running it again rather than from a checkpoint.
+        """
+        self._set_batch_source(IMPORT_RUN_SOURCE, resumable=False)
+        self._fetched_artists_to_process = self._iter_unknown_artists(
+            artists
+        )
+
+    def _iter_unknown_artists(self, artists):
+        """Yield the artists not in the database, checking a chunk at once."""
+        artists = iter(artists)
+        chunk = list(islice(artists, IMPORT_CHUNK_SIZE))
+        while chunk:
+            known = self._get_known_name_keys([a.name for a in chunk])
+            for artist in chunk:
+                key = normalize_name(artist.name)
+                if key not in known:
+                    known.add(key)
+                    yield artist
+            chunk = list(islice(artists, IMPORT_CHUNK_SIZE))
+
+    def _get_playlist_ids(self, url=None, user_id=None, playlist_id=None):
+        """Get the user and playlist ids, from the URL if there is one."""
         if url is None and (user_id is None or playlist_id is None):
             raise ValueError(
                 "Provide either playlist URL or user id AND playlist id."
@@ -630,61 +1464,187 @@ class Genderifier(object):
             playlist_id = parts[parts.index('playlist') + 1]
             if '?' in playlist_id:
                 playlist_id = playlist_id.split('?')[0]
+        return user_id, playlist_id
 
-        resp = self.get_playlist(user_id, playlist_id)
+    def _get_response_error(self, resp):
+        """Get the error to raise for a Spotify response we can't use."""
+        try:
+            return RuntimeError(resp['error']['message'])
+        except (KeyError, TypeError):
+            return RuntimeError("Response was weird: {}".format(resp))
+
+    def _is_playlist_unchanged(self, resp, snapshot_id):
+        """See if a playlist's the snapshot we stored; if so, batch nothing."""
         try:
             self._playlist_name = resp['name']
             self._playlist_description = resp['description']
-            artist_set = set()
-            for track in resp['tracks']['items']:
-                artists = track['track']['artists']
-                for artist in artists:
-                    artist_set.add(
-                        Artist(
-                            name=artist['name'],
-                            spotify_id=artist['id'],
-                            wiki_url=None,
-                            lastfm_url=None
-                        )
-                    )
-            self._fetched_artists_to_process = list(artist_set)
+            unchanged = resp['snapshot_id'] == snapshot_id
         except KeyError:
-            try:
-                error = resp['error']['message']
-                raise RuntimeError(error)
-            except KeyError:
-                raise RuntimeError("Response was weird: {}".format(resp))
+            raise self._get_response_error(resp)
+        if unchanged:
+            self.log(
+                u"Playlist unchanged since it was last looked up.", fg="blue"
+            )
+            self._fetched_artists_to_process = []
+        return unchanged
+
+    def _set_artist_batch_from_playlist_response(self, resp, playlist_id=None,
+                                                 known=frozenset()):
+        """Set the artists on the tracks of a playlist response to process.
+
+        Only the first page of tracks comes with the playlist, so the batch
+        is a generator that fetches the rest as its artists are worked on.
+        Given the ``playlist_id``, its artists are stored as its snapshot,
+        and those ``known`` (by name) from the last one are skipped.
+        """
+        try:
+            self._playlist_name = resp['name']
+            self._playlist_description = resp['description']
+            tracks = resp['tracks']
+        except KeyError:
+            raise self._get_response_error(resp)
+        snapshot_id = resp.get('snapshot_id')
+        if playlist_id is not None and snapshot_id is not None:
+            self._playlist_snapshot = (playlist_id, snapshot_id)
+        else:
+            self._playlist_snapshot = None
+        self._fetched_artists_to_process = self._iter_playlist_artists(
+            self._iter_playlist_pages(tracks), self._playlist_snapshot, known
+        )
+
+    def _get_playlist_tracks(self, url):
+        """Get the page of a playlist's tracks at a ``next`` URL."""
+        req = self._get(url, headers=self._get_spotify_headers())
+        return req.json()
+
+    def _iter_playlist_pages(self, tracks):
+        """Yield each page of a playlist's tracks, following the next links.
+
+        The next page is fetched in the background while the one before it
+        is being worked through.
+        """
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            while tracks is not None:
+                next_url = tracks.get('next')
+                next_page = executor.submit(
+                    self._get_playlist_tracks, next_url
+                ) if next_url else None
+                yield tracks
+                tracks = next_page.result() if next_page else None
+
+    def _get_new_playlist_artists(self, tracks, seen):
+        """Get the artists on a page of tracks not in ``seen``, adding them.
+
+        Artists are told apart by Spotify ID (or name, for local files), so
+        ``seen`` stays small however long the playlist.
+        """
+        try:
+            items = tracks['items']
+        except KeyError:
+            raise self._get_response_error(tracks)
+        artists = []
+        for item in items:
+            track = item.get('track')
+            if not track:  # since removed from Spotify
+                continue
+            for artist in track['artists']:
+                key = artist['id'] or normalize_name(artist['name'])
+                if key in seen:
+                    continue
+                seen.add(key)
+                artists.append(Artist(
+                    name=artist['name'],
+                    spotify_id=artist['id'],
+                    wiki_url=None,
+                    lastfm_url=None
+                ))
+        return artists
+
+    def _iter_playlist_artists(self, pages, snapshot=None, known=frozenset()):
+        """Yield each artist on the playlist once, in order.
+
+        Each page's artists are stored under the ``snapshot`` (if any), but
+        those ``known`` already aren't yielded.
+        """
+        seen = set()
+        position = 0
+        for tracks in pages:
+            artists = self._get_new_playlist_artists(tracks, seen)
+            if snapshot is not None:
+                self._store_playlist_artists(*snapshot, position, artists)
+            position += len(artists)
+            for artist in artists:
+                if normalize_name(artist.name) not in known:
+                    yield artist
 
     def add_to_report(self, dbrow):
         """Report on this result..."""
         artist, context, gender, is_group, lead_gender, members = dbrow
-        if artist in self._report['artists']:
-            return
+        if self._run_id is not None:
+            with self._lock:  # written with the next commit
+                self._uncommitted_run_artists.add(
+                    (self._run_id, normalize_name(artist.name))
+                )
         if not is_group:
-            self._report['artists'].add(artist)
-            self._report[gender or "unknown"].append(artist._asdict())
+            self._report.add(artist, gender)
 
     def get_report(self):
         """Get report on batches processed this session."""
-        unique_artists = len(self._report['artists'])
-        report_str = ", ".join([
-            "{} {} {}".format(
-                len(self._report[gender]),
-                gender,
-                "person" if len(self._report[gender]) == 1 else "people"
-            )
-            for gender in ['nonbinary', 'female', 'male', 'unknown']
-        ])
-        print(
-            "Of {} unique artists found, they are made up of "
-            "{}".format(unique_artists, report_str)
-        )
-        return self._report
-
-    def genderise_batch(self):
-        """Just start genderising the batch."""
+        report = self._report.get_report()
+        print(format_report(report))
+        return report
+
+    def get_db_report(self):
+        """Get report on every artist in the database."""
+        with self._lock:
+            report = get_db_report(self._get_db())
+        print(format_report(report))
+        return report
+
+    def get_playlist_report(self, playlist_id=None):
+        """Get report on a playlist (the last one set) as stored.
+
+        If its last batch couldn't all be looked up, it's as of the snapshot
+        that batch read, not the (older) one stored.
+        """
+        playlist_id = playlist_id or self._playlist_id
+        snapshot_id = None
+        if self._unstored_snapshot is not None and \
+                self._unstored_snapshot[0] == playlist_id:
+            snapshot_id = self._unstored_snapshot[1]
+        with self._lock:
+            report = get_playlist_report(
+                self._get_db(), playlist_id, snapshot_id
+            )
+        print(format_report(report))
+        return report
+
+    def _iter_batch(self):
+        """Yield the batch's artists, prefetching for a chunk at a time.
+
+        The batch can be any iterable, so artists streamed in (from a long
+        playlist) are worked on as they come.
+        """
+        artists = iter(self._fetched_artists_to_process)
+        chunk = list(islice(artists, BATCH_CHUNK_SIZE))
+        while chunk:
+            self._prefetch(self._sources, chunk)
+            for artist in chunk:
+                yield artist
+            chunk = list(islice(artists, BATCH_CHUNK_SIZE))
+
+    def genderise_batch(self, workers=None):
+        """Just start genderising the batch, optionally on many threads."""
+        self._clear_prefetched()
+        self._start_run()
+        snapshot, self._playlist_snapshot = self._playlist_snapshot, None
+        self._unstored_snapshot = None
+        self._batch_incomplete = False
+        if workers and workers > 1:
+            self._genderise_batch_concurrently(workers)
+            return self._finish_batch(snapshot)
         offset = self._get_offset()
-        for ix, artist in enumerate(self._fetched_artists_to_process):
+        for ix, artist in enumerate(self._iter_batch()):
             try:
                 self.genderise(artist)
             except (KeyboardInterrupt, SystemExit):
@@ -692,29 +1652,70 @@ class Genderifier(object):
                 raise
             finally:
                 self._set_offset(offset + ix + 1)
+        self._finish_batch(snapshot)
+
+    def _genderise_batch_concurrently(self, workers):
+        """Genderise the batch on a pool of worker threads.
 
-    def _get_artist_soup(self, source):
+        Only a couple of artists a worker are queued at once, topped up as
+        they finish, so a streamed batch is never all in memory.
+        """
+        offset = self._get_offset()
+        executor = ThreadPoolExecutor(max_workers=workers)
+        artists = enumerate(self._iter_batch())
+        futures = {}
+        progress = BatchProgress()
+        try:
+            for ix, artist in islice(artists, 2 * workers):
+                futures[executor.submit(self.genderise, artist)] = ix
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                advanced = [progress.finish(futures.pop(f)) for f in done]
+                if any(advanced):
+                    self._set_offset(offset + progress.done_up_to)
+                for future in done:
+                    future.result()
+                for ix, artist in islice(artists, len(done)):
+                    futures[executor.submit(self.genderise, artist)] = ix
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _get_artist_page(self, source):
         """Defer to different source."""
-        return getattr(self, '_{}_get_artist_soup'.format(source))()
+        return getattr(self, '_{}_get_artist_page'.format(source))()
 
-    def _is_group(self, source, soup):
+    def _is_group(self, source, page):
         """Defer to different source."""
-        return getattr(self, '_{}_is_group'.format(source))(soup)
+        return getattr(self, '_{}_is_group'.format(source))(page)
 
-    def _get_bio(self, source, soup):
+    def _get_bio(self, source, page):
         """Defer to different source."""
         return getattr(
             self, '_{}_get_bio'.format(source)
-        )(soup)
+        )(page)
+
+    def _get_person_gender(self, source, page):
+        """Get the gender and context from a person's bio, if it has one.
+
+        False if it has one, but we're not sure enough of the gender.
+        """
+        corpus = self._get_bio(source, page)
+        if corpus is None or not corpus.strip():
+            return None
+        if self._classifier == 'score':
+            return self._score_gender_and_context(corpus)
+        return self._get_gender_and_context(corpus)
 
     def _genderise_from_source(self, source):
-        """Try and get a result from a source."""
+        """Try and get a result from a source, False if it was unsure."""
         result = None
-        artist_soup = self._get_artist_soup(source)
-        if artist_soup:
-            is_group = self._is_group(source, artist_soup)
+        artist_page = self._get_artist_page(source)
+        if artist_page:
+            is_group = self._is_group(source, artist_page)
             if is_group:
-                lead, members = self._get_group_genders(source, artist_soup)
+                lead, members = self._get_group_genders(source, artist_page)
                 result = self.store(
                     self._current_artist_stack[-1],
                     is_group=True,
@@ -722,10 +1723,10 @@ class Genderifier(object):
                     members=members
                 )
             else:
-                corpus = self._get_bio(source, artist_soup)
-                if corpus is None or not corpus.strip():
-                    return None
-                gender, context = self._get_gender_and_context(corpus)
+                found = self._get_person_gender(source, artist_page)
+                if not found:
+                    return found
+                gender, context = found
                 result = self.store(
                     self._current_artist_stack[-1],
                     gender=gender,
@@ -733,98 +1734,213 @@ class Genderifier(object):
                 )
         return result
 
-    def _get_group_genders(self, source, soup):
-        """Get the genders of all the group members."""
+    def _get_group_members(self, source, page):
+        """Get the members to look up, or None if nested too deep."""
         if len(self._current_artist_stack) > 1:
             self.log("Bailing - too many groups deep.", fg="red")
-            return None, []
+            return None
+        return getattr(self, '_{}_get_group_members'.format(source))(page)
 
-        lead = None
-        names = []
-        genders = []
-        fn = getattr(self, '_{}_get_group_members'.format(source))
-        for ix, artist in enumerate(fn(soup)):
-            gender = self.genderise(artist)
-            names.append(artist.name)
-            genders.append(gender)
-            if ix == 0:
-                lead = gender
+    def _count_member_genders(self, artists, genders):
+        """Sum up the member genders, the first member being the 'lead'."""
         gender_counts = Counter(genders)
         members = MemberResults(
             gender_counts['nonbinary'],
             gender_counts['female'],
             gender_counts['male'],
             gender_counts[None],
-            ", ".join(names)
+            ", ".join([artist.name for artist in artists]),
+            tuple(artists)
         )
+        lead = genders[0] if genders else None
         return lead, members
 
-    def genderise(self, artist):
-        """Get the gender of the artist name."""
-        self.log(
-            '--------------- {} -----------------'.format(self._get_offset())
-        )
+    def _get_group_genders(self, source, page):
+        """Get the genders of all the group members."""
+        artists = self._get_group_members(source, page)
+        if artists is None:
+            return None, []
+        self._prefetch([source], artists)
+        if self._member_workers > 1 and len(artists) > 1:
+            genders = self._genderise_concurrently(
+                artists, self._member_workers
+            )
+        else:
+            genders = [self.genderise(artist) for artist in artists]
+        return self._count_member_genders(artists, genders)
+
+    def _genderise_concurrently(self, artists, workers):
+        """Genderise some artists on a few threads, return genders in order.
+
+        Each lookup runs in a copy of this context, so members still know
+        which group they're being looked up for.
+        """
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run, self.genderise, artist
+                )
+                for artist in artists
+            ]
+            return [future.result() for future in futures]
+
+    def _get_known_result(self, artist):
+        """Check the database for an artist we needn't fetch again.
+
+        Returns the stored ``DBRow`` (already reported on, bar a group's
+        members), or None when the artist should be fetched. Stale rows are
+        deleted first; if that fails, returns False and the artist should be
+        skipped.
+        """
         name = artist.name
         result = self._checked_result(name)
-        if result:
-            if result.gender is None and not result.is_group:
-                self.log(
-                    u"Found {} in database, but unknown gender...".format(
-                        name
-                    ), fg="blue"
-                )
-                if not self._delete_artist(name):
-                    self.log(
-                        "Couldn't delete old record... skipping.", fg="red"
-                    )
-                    return
-            elif self._force_fetch:
-                self.log(
-                    u"Found {} in database, but forcing a re-fetch".format(
-                        name
-                    ), fg="blue"
-                )
-                if not self._delete_artist(name):
-                    self.log(
-                        "Couldn't delete old record... skipping.", fg="red"
+        miss = None if self._force_fetch else self._get_miss(name)
+        if miss and (not result or not result.is_group):
+            reason, retry_after = miss
+            self.log(
+                u"Skipping {}, {} until {}.".format(
+                    name, reason, time.strftime(
+                        '%Y-%m-%d %H:%M', time.localtime(retry_after)
                     )
-                    return
-            elif result.is_group:
-                for name in result.members.names.split(', '):
-                    self.genderise(self.get_artist_obj_from_name(name))
-                return
-            else:
-                self.log(u"Found {} in database.".format(name))
-                self.add_to_report(result)
-                self.show_log_line(*result)
-                return result.gender
+                ), fg="blue"
+            )
+            result = result or DBRow(artist, '', None, False, '', None)
+            self.add_to_report(result)
+            return result
+        if not result:
+            return None
+        if result.gender is None and not result.is_group:
+            self.log(
+                u"Found {} in database, but unknown gender...".format(
+                    name
+                ), fg="blue"
+            )
+        elif self._force_fetch:
+            self.log(
+                u"Found {} in database, but forcing a re-fetch".format(
+                    name
+                ), fg="blue"
+            )
+        elif result.is_group:
+            self.add_to_report(result)  # just its run; members as they come
+            return result
+        else:
+            self.log(u"Found {} in database.".format(name))
+            self.add_to_report(result)
+            self.show_log_line(*result)
+            return result
 
-        gender = None
-        self.log(u'Trying to get gender(s) for {}...'.format(name))
+        if not self._delete_artist(name):
+            self.log(
+                "Couldn't delete old record... skipping.", fg="red"
+            )
+            return False
+        return None
 
-        self._current_artist_stack.append(artist)
-        sources = ['wiki', 'lastfm']
-        result = None
-        while len(sources) and result is None:
-            result = self._genderise_from_source(sources.pop())
+    def _report_known_member(self, artist, row):
+        """Report on a stored group's member, if they needn't be looked up.
 
+        Only members stored with a gender are; as with ``_get_known_result``,
+        the rest are looked up again (or skipped, if backing off).
+        """
+        if row is None or row.is_group or row.gender is None:
+            return False
+        self.log(u"Found {} in database.".format(artist.name))
+        self.add_to_report(row)
+        self.show_log_line(*row)
+        return True
+
+    def _report_lookup(self, artist, result):
+        """Report on a fresh lookup, return the gender found."""
         if result is not None:
             self.add_to_report(result)
-            gender = result.gender
-        else:
-            self.add_to_report(
-                DBRow(artist, '', None, False, '', None)
-            )
-            self.log(
-                u"Couldn't find a gender for {}".format(artist.name), fg="red"
+            return result.gender
+        self.add_to_report(
+            DBRow(artist, '', None, False, '', None)
+        )
+        self.log(
+            u"Couldn't find a gender for {}".format(artist.name), fg="red"
+        )
+        return None
+
+    def _remember_lookup(self, artist, result, unsure=False):
+        """Note (or forget) a failed lookup, so we know to back off."""
+        if result is None:
+            self._store_miss(
+                artist.name, 'low confidence' if unsure else 'not found'
             )
-        self._current_artist_stack.pop()
-        return gender
+        elif result.gender is None and not result.is_group:
+            self._store_miss(artist.name, 'gender unknown')
+        else:
+            self._delete_miss(artist.name)
+
+    def _genderise_known_group(self, artist):
+        """Report on each member of a stored group, looking up any not."""
+        for member, row in self._get_member_results(artist.name):
+            if not self._report_known_member(member, row):
+                self.genderise(member)
+
+    def _genderise_from_sources(self):
+        """Try each source in turn, until one has a result.
+
+        Returns the result (or None), whether any source was only unsure of
+        the gender and whether any couldn't be reached.
+        """
+        sources = list(self._sources)
+        result = None
+        unsure = unreachable = False
+        while len(sources) and result is None:
+            source = sources.pop()
+            try:
+                result = self._genderise_from_source(source)
+            except FetchError as error:
+                self.log(u"Giving up on {}: {}".format(source, error),
+                         fg="red")
+                unreachable = True
+            if result is False:
+                result, unsure = None, True
+        return result, unsure, unreachable
+
+    def genderise(self, artist):
+        """Get the gender of the artist name."""
+        self.log(
+            '--------------- {} -----------------'.format(self._offset)
+        )
+        result = self._get_known_result(artist)
+        if result is False:
+            return
+        if result:
+            if result.is_group:
+                self._genderise_known_group(artist)
+                return
+            return result.gender
+
+        self.log(u'Trying to get gender(s) for {}...'.format(artist.name))
+
+        token = self._push_artist(artist)
+        try:
+            result, unsure, unreachable = self._genderise_from_sources()
+        finally:
+            self._pop_artist(token)
+        if result is not None or not unreachable:
+            self._remember_lookup(artist, result, unsure)
+        else:  # try again next time
+            self._batch_incomplete = True
+        return self._report_lookup(artist, result)
 
 
 class GenderifierLastFMAPI(Genderifier):
     """Dud bits from the lastfm API which doesn't give rich info."""
 
+    def __init__(self, *args, **kwargs):
+        """Setup, with ``lastfm_rate`` API requests a second at most."""
+        lastfm_rate = kwargs.pop('lastfm_rate', LASTFM_API_RATE)
+        self._lastfm_workers = kwargs.pop('lastfm_workers', 10)
+        kwargs.setdefault('sources', ('wiki', 'lastfmapi'))
+        super(GenderifierLastFMAPI, self).__init__(*args, **kwargs)
+        self._scheduler.set_rate(urlsplit(LASTFM_API_URL).netloc, lastfm_rate)
+        self._lastfm_infos = LRUCache(PREFETCH_CACHE_SIZE)
+
     def _lastfm_is_group_from_api(self, bio):
         """Try and see if this is a group.. hard..."""
         artist = self._current_artist_stack[-1]
@@ -858,29 +1974,87 @@ class GenderifierLastFMAPI(Genderifier):
         if first_group_index < first_pronoun_index:
             return True
 
-    def _lastfm_get_bio_via_api(self):
-        """Lookup the artist on Last.fm and get bio from there."""
-        if not self._lastfm_api_key:
-            return None
-
-        artist = self._current_artist_stack[-1]
-        url = u"http://ws.audioscrobbler.com/2.0/"
+    def _lastfmapi_fetch_info(self, name):
+        """Get an artist's info from the API, when the rate limit allows."""
         query = {
             'method': 'artist.getinfo',
-            'artist': artist.name,
+            'artist': name,
             'api_key': self._lastfm_api_key,
             'format': 'json'
         }
-        self.log("Trying Last.FM...")
-        req = requests.get(url, params=query, headers=self._get_headers())
+        req = self._get(
+            LASTFM_API_URL, params=query, headers=self._get_headers()
+        )
         result_json = req.json()
         if result_json.get('error'):
             self.log(result_json['message'], fg='red')
             return None
+        return result_json['artist']
+
+    def _lastfmapi_get_info(self, name):
+        """Get an artist's info, from the batch's lookup if it was in it."""
+        info = self._lastfm_infos.get(name, False)  # None if not found
+        if info is False:
+            info = self._lastfmapi_fetch_info(name)
+            self._lastfm_infos.put(name, info)
+        return info
+
+    def _clear_prefetched(self):
+        """Forget what was looked up up front for the last batch."""
+        super(GenderifierLastFMAPI, self)._clear_prefetched()
+        self._lastfm_infos = LRUCache(PREFETCH_CACHE_SIZE)
+
+    def _prefetch(self, sources, artists):
+        """Get the whole batch's Last.FM info at once, as fast as allowed."""
+        super(GenderifierLastFMAPI, self)._prefetch(sources, artists)
+        if 'lastfmapi' not in sources or not self._lastfm_api_key:
+            return
+        names = [
+            name for name in dict.fromkeys([artist.name for artist in artists])
+            if name not in self._lastfm_infos
+        ]
+        if not names:
+            return
+        self.log(
+            u"Getting Last.FM info for {} artists...".format(len(names)),
+            fg='blue'
+        )
+        with ThreadPoolExecutor(max_workers=self._lastfm_workers) as pool:
+            futures = {
+                pool.submit(self._lastfmapi_fetch_info, name): name
+                for name in names
+            }
+            for future in as_completed(futures):
+                try:
+                    self._lastfm_infos.put(futures[future], future.result())
+                except FetchError as error:  # tried again in its turn
+                    self.log(error, fg='red')
+
+    def _lastfmapi_get_artist_page(self):
+        """Get the artist's info from the API, in place of a page.
+
+        None if it looks like a group, as the API has no members to look up.
+        """
+        if not self._lastfm_api_key:
+            return None
+        artist = self._current_artist_stack[-1]
+        self.log("Trying Last.FM API...")
+        info = self._lastfmapi_get_info(artist.name)
+        if info is None:
+            return None
+        if self._lastfm_is_group_from_api(self._lastfmapi_get_bio(info)):
+            # the API doesn't list members, so leave it to a source that does
+            self.log("This looks like a group, trying elsewhere...", fg="red")
+            return None
         self._current_artist_stack[-1] = Artist(
-            artist.name,
-            artist.spotify_id,
-            artist.wiki_url,
-            result_json['artist']['url']
+            artist.name, artist.spotify_id, artist.wiki_url, info['url']
         )
-        return result_json['artist']['bio']['content']
+        return info
+
+    def _lastfmapi_is_group(self, info):
+        """Not a group - those are passed over when getting the info."""
+        return False
+
+    def _lastfmapi_get_bio(self, info):
+        """Get the bio out of the artist's info."""
+        return info.get('bio', {}).get('content') or u""
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+from functools import cached_property
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from genderify.pronouns import PRONOUN_RE
+
+try:
+    import lxml  # noqa
+    DEFAULT_PARSER = 'lxml'
+except ImportError:  # nocov
+    DEFAULT_PARSER = 'html.parser'
+
+# Everything we read off a Wikipedia page - the redirect notice, hatnotes,
+# infobox, paragraphs and links - is inside the article column.
+WIKI_STRAINER = SoupStrainer(id='content')
+# ...and off a Last.FM wiki page, just the factbox and the bio.
+LASTFM_STRAINER = SoupStrainer(class_=['factbox-item', 'wiki-content'])
+# Give up on finding a pronoun after this many paragraphs of a streamed page.
+STREAM_MAX_PARAGRAPHS = 20
+
+
+def make_soup(markup, parser=None, strainer=None):
+    """Parse a page, only building the parts the strainer lets through.
+
+    Pages that aren't laid out as expected (so nothing gets through) are
+    parsed in full instead.
+    """
+    parser = parser or DEFAULT_PARSER
+    if strainer is not None:
+        soup = BeautifulSoup(markup, parser, parse_only=strainer)
+        if soup.contents:
+            return soup
+    return BeautifulSoup(markup, parser)
+
+
+class WikiPage(object):
+    """A Wikipedia page, each part of it pulled out of the soup just once.
+
+    Everything is read from the article column, as ``WIKI_STRAINER`` lets
+    through, so a page parsed in full gives the same results.
+    """
+
+    def __init__(self, soup):
+        """Setup."""
+        self.soup = soup
+
+    @cached_property
+    def content(self):
+        """The article column, or the whole page if it hasn't one."""
+        return self.soup.find(id='content') or self.soup
+
+    @cached_property
+    def infobox_rows(self):
+        """The row headers of the infobox."""
+        return self.content.select('table.infobox tr th[scope="row"]')
+
+    @cached_property
+    def infobox_labels(self):
+        """The text of the infobox row headers."""
+        return [th.text for th in self.infobox_rows]
+
+    @cached_property
+    def text(self):
+        """All the text on the page."""
+        return self.content.text
+
+    @cached_property
+    def text_lower(self):
+        """All the text on the page, lower case."""
+        return self.text.lower()
+
+    @cached_property
+    def links(self):
+        """The ``(text, href)`` of every link on the page."""
+        return [(link.text, link.get('href')) for link in self.content('a')]
+
+    @cached_property
+    def bio(self):
+        """The text of all the paragraphs."""
+        return ' '.join([p.get_text() for p in self.content.find_all('p')])
+
+    @cached_property
+    def members(self):
+        """The ``(name, href)`` of each member in the infobox, if a group."""
+        try:
+            members_ix = self.infobox_labels.index('Members')
+        except ValueError:
+            return None
+        cell = self.infobox_rows[members_ix].parent.find('td')
+        members = cell.find_all('li')
+        if not members:
+            members = [
+                el for el in list(cell.children)
+                if el not in ('<br/>', '\n')
+            ]
+        results = []
+        for member in members:
+            href = None
+            try:
+                name = member.text.strip()
+                link = member.find('a')
+                if link:
+                    href = link['href']
+            except AttributeError:
+                name = member.strip()
+            results.append((name, href))
+        return results
+
+
+class LastFMPage(object):
+    """A Last.FM wiki page, each part of it pulled out just once."""
+
+    def __init__(self, soup):
+        """Setup."""
+        self.soup = soup
+
+    @cached_property
+    def factbox_items(self):
+        """The 'factbox' rows from the RHS of the page."""
+        return self.soup.select('li.factbox-item')
+
+    @cached_property
+    def factbox_labels(self):
+        """The headings of the factbox rows."""
+        return [li.find('h4').text for li in self.factbox_items]
+
+    @cached_property
+    def bio(self):
+        """The text of the wiki paragraphs."""
+        paras = self.soup.select('div.wiki-content p')
+        return ' '.join([p.get_text() for p in paras])
+
+    @cached_property
+    def members(self):
+        """The ``(name, href)`` of each member in the factbox, if a group."""
+        try:
+            members_ix = self.factbox_labels.index('Members')
+        except ValueError:
+            return None
+        results = []
+        for member in self.factbox_items[members_ix].find('ul').find_all('li'):
+            link = member.find('a')
+            if link:
+                results.append((link.text.strip(), link['href']))
+            else:
+                results.append((member.find('span').text.strip(), None))
+        return results
+
+
+class WikiStreamWatcher(HTMLParser):
+    """Watch a Wikipedia page stream in, to tell when we've read enough.
+
+    The infobox comes before the lead, so once a paragraph outside it
+    has had a pronoun in, everything we read off the page has gone past
+    (bar the rest of the bio). Failing that, stop after ``max_paragraphs``.
+    """
+
+    def __init__(self, max_paragraphs=STREAM_MAX_PARAGRAPHS):
+        """Setup."""
+        super(WikiStreamWatcher, self).__init__()
+        self._max_paragraphs = max_paragraphs
+        self._infobox_depth = 0
+        self._paragraph = None
+        self.paragraphs = 0
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        """Note going into the infobox or a paragraph."""
+        if tag == 'table' and (
+            self._infobox_depth or
+            'infobox' in (dict(attrs).get('class') or '').split()
+        ):
+            self._infobox_depth += 1
+        elif tag == 'p' and not self._infobox_depth:
+            self._paragraph = []
+
+    def handle_endtag(self, tag):
+        """Note coming out of the infobox or a paragraph."""
+        if tag == 'table' and self._infobox_depth:
+            self._infobox_depth -= 1
+        elif tag == 'p' and self._paragraph is not None:
+            text = u"".join(self._paragraph)
+            self._paragraph = None
+            self.paragraphs += 1
+            if PRONOUN_RE.search(u' ' + text.lower()):
+                self.done = True
+            elif self.paragraphs >= self._max_paragraphs:
+                self.done = True
+
+    def handle_data(self, data):
+        """Collect the text of the paragraph we're in."""
+        if self._paragraph is not None:
+            self._paragraph.append(data)
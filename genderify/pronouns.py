@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+import re
+
+PRONOUN_MAP = {
+    'their': 'nonbinary',
+    'they': 'nonbinary',
+    'them': 'nonbinary',
+    'her': 'female',
+    'she': 'female',
+    'his': 'male',
+    'him': 'male',
+    'he': 'male',
+}
+
+# How many words either side of the pronoun make up its context.
+CONTEXT_WORDS = 5
+# How many words after a mention of the artist a pronoun's weight halves.
+NEAR_WORDS = 20
+
+NON_WORD_RE = re.compile(r'[^\w]')
+# A (lower cased) word that is a pronoun once its punctuation is stripped.
+# Words are split on single spaces, so each is matched from the space before
+# it - a literal to skip ahead to - up to the next space or the end.
+PRONOUN_RE = re.compile(
+    u' [^\\w ]*(?:{})[^\\w ]*(?![^ ])'.format(u'|'.join([
+        u'[^\\w ]*'.join(pronoun)
+        for pronoun in sorted(PRONOUN_MAP, key=len, reverse=True)
+    ]))
+)
+
+
+def _get_context(corpus, start, ix, legacy=False):
+    """Get the words around the ``ix``th one, which starts at ``start``.
+
+    With ``legacy``, a pronoun in the first five words gets the window the
+    old word-list slice gave it (which wraps around to the end, so is empty
+    for all but tiny corpora) instead of one cut short at the start.
+    """
+    if legacy and ix < CONTEXT_WORDS:
+        if corpus.count(' ') + 1 >= 2 * CONTEXT_WORDS:
+            return u""
+        words = corpus.split(' ')
+        return u" ".join(words[ix - CONTEXT_WORDS:ix + CONTEXT_WORDS])
+
+    begin = start
+    for _ in range(CONTEXT_WORDS + 1):
+        begin = corpus.rfind(' ', 0, begin)
+        if begin == -1:
+            break
+    end = start
+    for _ in range(CONTEXT_WORDS):
+        end = corpus.find(' ', end + 1)
+        if end == -1:
+            end = len(corpus)
+            break
+    return corpus[begin + 1:end]
+
+
+def _get_context_at(corpus, lowered, start, ix, legacy=False):
+    """Get the words around one found in ``lowered`` (the padded corpus)."""
+    if len(lowered) != len(corpus) + 1:
+        # lower() grew a character (e.g. 'İ'), so positions are off - fall
+        # back to the list of words
+        words = corpus.split(' ')
+        low = ix - CONTEXT_WORDS
+        if low < 0 and not legacy:
+            low = 0
+        return u" ".join(words[low:ix + CONTEXT_WORDS])
+    return _get_context(corpus, start, ix, legacy)
+
+
+def get_gender_and_context(corpus, legacy_context=False):
+    """Find the first pronoun in the corpus, and the words around it.
+
+    Same answer as lower casing each space-separated word, stripping its
+    non-word characters and looking it up, but in one compiled scan that
+    never builds the list of words.
+    """
+    lowered = u' ' + corpus.lower()
+    match = PRONOUN_RE.search(lowered)
+    if match is None:
+        return None, None
+    pronoun = NON_WORD_RE.sub(u'', match.group())
+    ix = lowered.count(' ', 1, match.start() + 1)
+    context = _get_context_at(
+        corpus, lowered, match.start(), ix, legacy_context
+    )
+    return PRONOUN_MAP[pronoun], context
+
+
+def _count_words_to(lowered, positions):
+    """Get the index of the word at each of the (sorted) positions."""
+    ix = 0
+    counted_to = 1
+    for pos in positions:
+        ix += lowered.count(' ', counted_to, pos + 1)
+        counted_to = pos + 1
+        yield ix
+
+
+def _get_mentions(lowered, name):
+    """Get the words the artist is mentioned at, by name or surname."""
+    name = u" ".join(name.lower().split())
+    names = [name]
+    if len(name.split()) > 1 and len(name.split()[-1]) > 2:
+        names.append(name.split()[-1])
+    mentions = set()
+    for mention in names:
+        pos = lowered.find(mention)
+        while pos != -1:
+            if not lowered[pos - 1].isalnum():
+                mentions.add(pos)
+            pos = lowered.find(mention, pos + 1)
+    return list(_count_words_to(lowered, sorted(mentions)))
+
+
+def score_gender(corpus, name=None, near=NEAR_WORDS, max_contexts=3):
+    """Weigh up every pronoun in the corpus, not just the first.
+
+    Each pronoun counts for more the closer it follows a mention of the
+    artist (the start of the bio counts as one), so a few about someone
+    else further on don't outweigh the ones about them. Returns the
+    heaviest gender, the share of the total weight it has (0 to 1) and
+    the contexts of its heaviest pronouns, or ``(None, 0.0, [])``.
+    """
+    lowered = u' ' + corpus.lower()
+    mentions = _get_mentions(lowered, name) if name and name.strip() else []
+    matches = list(PRONOUN_RE.finditer(lowered))
+    scores = {}
+    hits = []
+    last_mention = 0
+    next_mention = 0
+    word_ixs = _count_words_to(lowered, [match.start() for match in matches])
+    for match, ix in zip(matches, word_ixs):
+        while next_mention < len(mentions) and mentions[next_mention] < ix:
+            last_mention = mentions[next_mention]
+            next_mention += 1
+        weight = 1.0 / (1 + (ix - last_mention) / float(near))
+        gender = PRONOUN_MAP[NON_WORD_RE.sub(u'', match.group())]
+        scores[gender] = scores.get(gender, 0.0) + weight
+        hits.append((weight, gender, match.start(), ix))
+    if not scores:
+        return None, 0.0, []
+
+    gender = max(sorted(scores), key=scores.get)
+    confidence = scores[gender] / sum(scores.values())
+    best = sorted([hit for hit in hits if hit[1] == gender], reverse=True)
+    contexts = [
+        _get_context_at(corpus, lowered, start, ix)
+        for _, _, start, ix in sorted(
+            best[:max_contexts], key=lambda hit: hit[2]
+        )
+    ]
+    return gender, confidence, contexts
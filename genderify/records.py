@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import csv
+from itertools import chain
+import json
+import os
+
+import click
+
+from genderify.gender_finder import Artist
+
+FORMATS = ('csv', 'ndjson', 'text')
+EXTENSIONS = {
+    '.csv': 'csv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.txt': 'text',
+}
+
+
+def get_format(first_line, path=None):
+    """Guess a file's format from its extension, or else its first line."""
+    if path:
+        extension = os.path.splitext(path)[1].lower()
+        if extension in EXTENSIONS:
+            return EXTENSIONS[extension]
+    if first_line.lstrip().startswith('{'):
+        return 'ndjson'
+    return 'text'
+
+
+def make_artist(record):
+    """Make an Artist from a record's fields, or None if it has no name."""
+    name = (record.get('name') or u"").strip()
+    if not name:
+        return None
+    return Artist(
+        name=name,
+        spotify_id=record.get('spotify_id') or None,
+        wiki_url=record.get('wiki_url') or None,
+        lastfm_url=record.get('lastfm_url') or None
+    )
+
+
+def _iter_ndjson(lines):
+    """Yield the record on each line, skipping (and saying) any bad ones."""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            record = None
+            problem = error
+        else:
+            problem = u"not an object"
+        if not isinstance(record, dict):
+            click.secho(
+                u"Skipping line {}: {}".format(number, problem), fg="yellow"
+            )
+            continue
+        yield record
+
+
+def iter_artists(stream, file_format=None, path=None):
+    """Yield an Artist for each record in a stream, a line at a time.
+
+    CSV needs a header row with a ``name`` column; NDJSON objects have a
+    ``name`` key; plain text is one name a line. Any other fields of the
+    ``Artist`` are optional.
+    """
+    first_line = stream.readline()
+    lines = chain([first_line], stream)
+    file_format = file_format or get_format(first_line, path)
+    if file_format not in FORMATS:
+        raise ValueError(u"Unknown format {}".format(file_format))
+    if file_format == 'csv':
+        records = csv.DictReader(lines)
+        if 'name' not in (records.fieldnames or []):
+            raise ValueError("CSV needs a 'name' column.")
+    elif file_format == 'ndjson':
+        records = _iter_ndjson(lines)
+    else:
+        records = ({'name': line} for line in lines)
+    for record in records:
+        artist = make_artist(record)
+        if artist is not None:
+            yield artist
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+import json
+import sqlite3
+import threading
+
+from genderify.schema import normalize_name
+
+GENDERS = ('nonbinary', 'female', 'male', 'unknown')
+# What a report of people counts; misses have no artists row, so are NULLs.
+PERSON_COUNTS = (
+    "COUNT(*), SUM(gender = 'nonbinary'), SUM(gender = 'female'), "
+    "SUM(gender = 'male'), SUM(gender IS NULL)"
+)
+# ...and of groups, how their members split.
+GROUP_COUNTS = (
+    "COUNT(*), SUM(nonbinary_count), SUM(female_count), SUM(male_count), "
+    "SUM(unknown_count)"
+)
+
+
+def make_report(artists=0, nonbinary=0, female=0, male=0, unknown=0):
+    """Make a report of how many people there are of each gender."""
+    return {
+        'artists': artists,
+        'nonbinary': nonbinary,
+        'female': female,
+        'male': male,
+        'unknown': unknown,
+    }
+
+
+def format_report(report):
+    """Sum up a report in a sentence."""
+    return "Of {} unique artists found, they are made up of {}".format(
+        report['artists'],
+        ", ".join([
+            "{} {} {}".format(
+                report[gender],
+                gender,
+                "person" if report[gender] == 1 else "people"
+            )
+            for gender in GENDERS
+        ])
+    )
+
+
+def _get_run_names_query(run_ids):
+    """Get the query for the names the runs came across, each just once."""
+    return (
+        "SELECT DISTINCT name_key FROM run_artists WHERE run_id IN ({})"
+        "".format(", ".join(["?"] * len(run_ids)))
+    )
+
+
+def get_db_report(curs, run_ids=None):
+    """Get the report on every person in the database, in one query.
+
+    As with a session's report, names that couldn't be found at all count
+    as unknown, and groups only through their members. With ``run_ids``,
+    only the people those runs came across are counted.
+    """
+    if run_ids is None:
+        curs.execute(
+            "SELECT " + PERSON_COUNTS + " FROM ("
+            "SELECT gender FROM artists WHERE is_group = 0 "
+            "UNION ALL "
+            "SELECT NULL FROM misses "
+            "WHERE name NOT IN (SELECT name_key FROM artists))"
+        )
+    else:
+        curs.execute(
+            "SELECT " + PERSON_COUNTS + " "
+            "FROM (" + _get_run_names_query(run_ids) + ") AS seen "
+            "LEFT JOIN artists ON artists.name_key = seen.name_key "
+            "WHERE COALESCE(artists.is_group, 0) = 0",
+            list(run_ids)
+        )
+    return make_report(*[count or 0 for count in curs.fetchone()])
+
+
+def get_playlist_report(curs, playlist_id, snapshot_id=None):
+    """Get the report on a playlist as of its stored snapshot, in one query.
+
+    With ``snapshot_id``, it's as of that one instead: read through, but
+    not stored as looked up (so those that couldn't be count as unknown).
+    As when it was looked up, the members of its groups (and theirs) count
+    as people too.
+    """
+    if snapshot_id is None:
+        listed = (
+            "SELECT playlist_artists.name_key FROM playlists "
+            "JOIN playlist_artists "
+            "ON playlist_artists.playlist_id = playlists.id "
+            "AND playlist_artists.snapshot_id = playlists.snapshot_id "
+            "WHERE playlists.id = ?"
+        )
+        params = (playlist_id,)
+    else:
+        listed = (
+            "SELECT name_key FROM playlist_artists "
+            "WHERE playlist_id = ? AND snapshot_id = ?"
+        )
+        params = (playlist_id, snapshot_id)
+    curs.execute(
+        "WITH RECURSIVE seen(name_key) AS (" + listed + " "
+        "UNION "
+        "SELECT group_members.member_key FROM seen "
+        "JOIN artists AS band ON band.name_key = seen.name_key "
+        "JOIN group_members ON group_members.group_id = band.id) "
+        "SELECT " + PERSON_COUNTS + " FROM seen "
+        "LEFT JOIN artists ON artists.name_key = seen.name_key "
+        "WHERE COALESCE(artists.is_group, 0) = 0",
+        params
+    )
+    return make_report(*[count or 0 for count in curs.fetchone()])
+
+
+def get_db_group_report(curs, run_ids=None):
+    """Get how many groups there are, and how their members split up."""
+    if run_ids is None:
+        curs.execute(
+            "SELECT " + GROUP_COUNTS + " FROM artists WHERE is_group = 1"
+        )
+    else:
+        curs.execute(
+            "SELECT " + GROUP_COUNTS + " "
+            "FROM (" + _get_run_names_query(run_ids) + ") AS seen "
+            "JOIN artists ON artists.name_key = seen.name_key "
+            "WHERE artists.is_group = 1",
+            list(run_ids)
+        )
+    counts = [count or 0 for count in curs.fetchone()]
+    report = make_report(sum(counts[1:]), *counts[1:])
+    report['groups'] = counts[0]
+    return report
+
+
+def get_run_ids(curs, run_ids=None):
+    """Get the runs to report on, or None for the whole database."""
+    if not run_ids:
+        return None
+    curs.execute(
+        "SELECT id FROM runs WHERE id IN ({})".format(
+            ", ".join(["?"] * len(run_ids))
+        ),
+        list(run_ids)
+    )
+    return [row[0] for row in curs.fetchall()]
+
+
+def get_runs(curs):
+    """Get each run, newest first, with how many artists it came across."""
+    curs.execute(
+        "SELECT runs.id, runs.source, runs.started_at, "
+        "(SELECT COUNT(*) FROM run_artists WHERE run_id = runs.id) "
+        "FROM runs ORDER BY runs.id DESC"
+    )
+    return [
+        {'id': id_, 'source': source, 'started_at': started_at,
+         'artists': artists}
+        for id_, source, started_at, artists in curs.fetchall()
+    ]
+
+
+def get_unknown_rate(report):
+    """Get the share of a report's people (0 to 1) of unknown gender."""
+    if not report['artists']:
+        return None
+    return report['unknown'] / float(report['artists'])
+
+
+class ReportAggregator(object):
+    """Count the people found, once each, without keeping them in memory.
+
+    The names already counted are kept in a temporary SQLite table, which
+    lives on disk once it outgrows its cache. With ``detail_path``, each
+    person counted is also written there as a line of JSON.
+    """
+
+    def __init__(self, detail_path=None):
+        """Setup."""
+        self._detail_path = detail_path
+        self._detail_file = None
+        self._seen = None
+        self._report = make_report()
+        self._lock = threading.Lock()
+
+    def _open(self):
+        """Create the table of names seen, and open the detail file."""
+        # an empty path is a private database, deleted when closed
+        self._seen = sqlite3.connect('', check_same_thread=False)
+        self._seen.execute("CREATE TABLE seen (name_key TEXT PRIMARY KEY)")
+        if self._detail_path:
+            self._detail_file = open(self._detail_path, 'a', encoding='utf-8')
+
+    def close(self):
+        """Drop the names seen, and close the detail file."""
+        with self._lock:
+            if self._seen is not None:
+                self._seen.close()
+                self._seen = None
+            if self._detail_file is not None:
+                self._detail_file.close()
+                self._detail_file = None
+
+    def add(self, artist, gender):
+        """Count a person, unless they already have been; True if counted."""
+        with self._lock:
+            if self._seen is None:
+                self._open()
+            curs = self._seen.execute(
+                "INSERT OR IGNORE INTO seen(name_key) VALUES (?)",
+                (normalize_name(artist.name),)
+            )
+            if not curs.rowcount:
+                return False
+            self._report['artists'] += 1
+            self._report[gender or 'unknown'] += 1
+            if self._detail_file is not None:
+                detail = artist._asdict()
+                detail['gender'] = gender
+                self._detail_file.write(json.dumps(detail) + "\n")
+            return True
+
+    def get_report(self):
+        """Get the counts so far."""
+        with self._lock:
+            return dict(self._report)
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+import unicodedata
+
+SEARCH_CHECKPOINT = 'search:year:0000-9999'
+
+
+def normalize_name(name):
+    """Get the key an artist's name is stored (and looked up) under."""
+    if name is None:
+        return None
+    return u" ".join(unicodedata.normalize('NFKC', name).split()).casefold()
+
+
+def _create_tables(curs):
+    """The tables as they were before there were migrations."""
+    curs.execute(
+        """
+        CREATE TABLE IF NOT EXISTS meta (
+            id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+            offset INTEGER
+
+        )
+        """
+    )
+    curs.execute(
+        """
+        CREATE TABLE IF NOT EXISTS artists (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            spotify_id TEXT,
+            wiki_url TEXT,
+            lastfm_url TEXT,
+            context TEXT,
+            gender TEXT,
+            is_group BOOLEAN,
+            lead_gender TEXT,
+            nonbinary_count INT,
+            female_count INT,
+            male_count INT,
+            unknown_count INT,
+            member_names TEXT
+        )
+        """
+    )
+    curs.execute(
+        """
+        CREATE TABLE IF NOT EXISTS misses (
+            name TEXT PRIMARY KEY,
+            reason TEXT,
+            attempts INTEGER,
+            tried_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            retry_after REAL
+        )
+        """
+    )
+
+
+def _index_artist_names(curs):
+    """Key artists (and misses) by normalized name, one row per name.
+
+    Where a name was stored more than once, keep its latest row that has a
+    gender (or is a group), else its latest row.
+    """
+    curs.execute("ALTER TABLE artists ADD COLUMN name_key TEXT")
+    curs.execute("UPDATE artists SET name_key = normalize_name(name)")
+    curs.execute("CREATE INDEX artists_name_key_dupes ON artists(name_key)")
+    curs.execute(
+        """
+        DELETE FROM artists WHERE id != (
+            SELECT keep.id FROM artists AS keep
+            WHERE keep.name_key = artists.name_key
+            ORDER BY (keep.gender IS NOT NULL OR keep.is_group) DESC,
+                keep.id DESC
+            LIMIT 1
+        )
+        """
+    )
+    curs.execute("DROP INDEX artists_name_key_dupes")
+    curs.execute("CREATE UNIQUE INDEX artists_name_key ON artists(name_key)")
+    curs.execute("CREATE INDEX artists_spotify_id ON artists(spotify_id)")
+
+    curs.execute(
+        """
+        DELETE FROM misses WHERE rowid != (
+            SELECT MAX(keep.rowid) FROM misses AS keep
+            WHERE normalize_name(keep.name) = normalize_name(misses.name)
+        )
+        """
+    )
+    curs.execute("UPDATE misses SET name = normalize_name(name)")
+
+
+def _add_checkpoints(curs):
+    """Keep one offset row per crawl source instead of a log of them all.
+
+    The old log only ever held search offsets worth resuming from, so its
+    latest one becomes the search checkpoint.
+    """
+    curs.execute(
+        """
+        CREATE TABLE checkpoints (
+            source TEXT PRIMARY KEY,
+            offset INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+        )
+        """
+    )
+    curs.execute(
+        """
+        CREATE TABLE checkpoint_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            offset INTEGER NOT NULL,
+            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+        )
+        """
+    )
+    curs.execute(
+        "INSERT INTO checkpoints(source, offset) "
+        "SELECT ?, offset FROM meta WHERE offset IS NOT NULL "
+        "ORDER BY id DESC LIMIT 1",
+        (SEARCH_CHECKPOINT,)
+    )
+    curs.execute("DROP TABLE meta")
+
+
+def _add_group_members(curs):
+    """Keep a row per group member, rather than just their names joined up.
+
+    Each member is linked to their own artists row, if they have one. The
+    groups stored before this only have ``member_names``, so their members
+    are split back out of it - wrongly, if a name has ", " in.
+    """
+    curs.execute(
+        """
+        CREATE TABLE group_members (
+            group_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            member_id INTEGER,
+            member_name TEXT NOT NULL,
+            member_key TEXT NOT NULL,
+            is_lead BOOLEAN NOT NULL DEFAULT 0,
+            PRIMARY KEY (group_id, position)
+        )
+        """
+    )
+    curs.execute(
+        "CREATE INDEX group_members_member_key ON group_members(member_key)"
+    )
+    curs.execute(
+        "SELECT id, member_names FROM artists "
+        "WHERE is_group AND member_names != ''"
+    )
+    curs.executemany(
+        "INSERT INTO group_members(group_id, position, member_name, "
+        "member_key, is_lead) VALUES (?, ?, ?, ?, ?)",
+        [
+            (group_id, position, name, normalize_name(name), position == 0)
+            for group_id, names in curs.fetchall()
+            for position, name in enumerate(names.split(', '))
+        ]
+    )
+    curs.execute(
+        "UPDATE group_members SET member_id = ("
+        "SELECT id FROM artists WHERE name_key = group_members.member_key)"
+    )
+
+
+def _add_runs(curs):
+    """Remember which artists each run came across, to report on it later.
+
+    Artists are keyed by name, so misses (with no artists row) count too.
+    The index lets the whole-database report count from it alone.
+    """
+    curs.execute(
+        """
+        CREATE TABLE runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+        )
+        """
+    )
+    curs.execute("CREATE INDEX runs_source ON runs(source)")
+    curs.execute(
+        """
+        CREATE TABLE run_artists (
+            run_id INTEGER NOT NULL,
+            name_key TEXT NOT NULL,
+            PRIMARY KEY (run_id, name_key)
+        ) WITHOUT ROWID
+        """
+    )
+    curs.execute(
+        "CREATE INDEX artists_is_group_gender ON artists(is_group, gender)"
+    )
+
+
+def _add_playlists(curs):
+    """Keep each playlist's artists, as of its last Spotify snapshot.
+
+    A playlist's ``snapshot_id`` is only set once all of its artists have
+    been looked up, so its rows under that snapshot are the ones to trust.
+    """
+    curs.execute(
+        """
+        CREATE TABLE playlists (
+            id TEXT PRIMARY KEY NOT NULL,
+            snapshot_id TEXT,
+            name TEXT,
+            description TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+        )
+        """
+    )
+    curs.execute(
+        """
+        CREATE TABLE playlist_artists (
+            playlist_id TEXT NOT NULL,
+            snapshot_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            spotify_id TEXT,
+            name TEXT NOT NULL,
+            name_key TEXT NOT NULL,
+            PRIMARY KEY (playlist_id, snapshot_id, position)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+# Append only: each database remembers how many of these it has had run.
+MIGRATIONS = [
+    _create_tables,
+    _index_artist_names,
+    _add_checkpoints,
+    _add_group_members,
+    _add_runs,
+    _add_playlists,
+]
+
+
+def migrate(conn):
+    """Bring the database schema up to date, one transaction per step."""
+    conn.create_function('normalize_name', 1, normalize_name)
+    conn.commit()
+    curs = conn.cursor()
+    curs.execute(
+        "CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"
+    )
+    curs.execute("SELECT MAX(version) FROM schema_version")
+    version = curs.fetchone()[0] or 0
+    for number, migration in enumerate(MIGRATIONS[version:], version + 1):
+        curs.execute("BEGIN")
+        try:
+            migration(curs)
+            curs.execute(
+                "INSERT INTO schema_version(version) VALUES (?)", (number,)
+            )
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+    return len(MIGRATIONS)
@@ -1,10 +1,93 @@
 # -*- coding: utf-8 -*-
+import csv
+import json
+import sqlite3
+
 import click
 
-from genderify.gender_finder import Genderifier
+from genderify.cache import DEFAULT_LRU_SIZE, DEFAULT_MAX_BYTES, DEFAULT_TTL
+from genderify.gender_finder import (
+    DB_FILE_PATH,
+    LASTFM_API_RATE,
+    SEARCH_PAGES_AHEAD,
+    WIKI_API_URL,
+    Genderifier,
+    GenderifierLastFMAPI,
+)
+from genderify.records import FORMATS, iter_artists
+from genderify.report import (
+    get_db_group_report,
+    get_db_report,
+    get_playlist_report,
+    get_run_ids,
+    get_runs,
+    get_unknown_rate,
+)
+from genderify.schema import migrate
 
+REPORT_FIELDS = (
+    'kind', 'groups', 'artists', 'nonbinary', 'female', 'male', 'unknown',
+    'unknown_rate'
+)
+RUN_FIELDS = ('id', 'source', 'started_at', 'artists')
 
-@click.command()
+
+def parse_host_rates(ctx, param, value):
+    """Get the --host-rate options as a dict of host to rate."""
+    host_rates = {}
+    for host_and_rate in value:
+        host, _, rate = host_and_rate.partition('=')
+        try:
+            host_rates[host] = float(rate)
+        except ValueError:
+            raise click.BadParameter(
+                "{} isn't HOST=RATE".format(host_and_rate)
+            )
+    return host_rates
+
+
+def get_genderifier_kwargs(options):
+    """Get the arguments to set up a Genderifier with, from the options."""
+    kwargs = dict(
+        spotify_token=options['spotify_token'],
+        lastfm_api_key=options['lastfm_key'],
+        batch_limit=options['batch_limit'],
+        db_file_path=options['db_file_path'],
+        force_fetch=options['force_fetch'],
+        pool_size=options['pool_size'],
+        timeout=options['timeout'],
+        member_workers=options['member_workers'],
+        use_cache=options['cache'],
+        cache_file_path=options['cache_file_path'],
+        cache_ttl=options['cache_ttl'],
+        cache_max_bytes=options['cache_size'] * 1024 * 1024,
+        row_cache_size=options['row_cache_size'],
+        report_detail_path=options['report_file'],
+        commit_every=options['commit_every'],
+        commit_interval=options['commit_interval'],
+        keep_checkpoint_history=options['checkpoint_history'],
+        parser=options['parser'],
+        strain=not options['full_parse'],
+        legacy_context=options['legacy_context'],
+        classifier=options['classifier'],
+        min_confidence=options['min_confidence'],
+        stream=options['stream'],
+        stream_max_bytes=options['stream_max_kb'] * 1024,
+        stream_max_paragraphs=options['stream_max_paragraphs'],
+        sources=(
+            'wikiapi' if options['wiki_api'] else 'wiki',
+            'lastfmapi' if options['lastfm_api'] else 'lastfm'
+        ),
+        wiki_api_url=options['wiki_api_url'],
+        host_rates=options['host_rate'],
+        retries=options['retries'],
+    )
+    if options['lastfm_api']:
+        kwargs['lastfm_rate'] = options['lastfm_rate']
+    return kwargs
+
+
+@click.group(invoke_without_command=True)
 @click.option(
     '--spotify-token', help="Spotify OAuth token."
 )
@@ -29,6 +112,10 @@ from genderify.gender_finder import Genderifier
     '--forever/--once', help="Keep going until killed, or just once.",
     default=False
 )
+@click.option(
+    '--search-ahead', help="With --forever, search result pages to keep "
+    "fetched ahead of the lookups.", default=SEARCH_PAGES_AHEAD, type=int
+)
 @click.option(
     '--force-fetch/--skip-found', help="Always re-try if already in database",
     default=False,
@@ -36,44 +123,274 @@ from genderify.gender_finder import Genderifier
 @click.option(
     '--playlist-url', help="A Spotify public playlist URL to scan."
 )
-def genderify(spotify_token, lastfm_key, name, offset, batch_limit,
-              db_file_path, forever, force_fetch, playlist_url):
+@click.option(
+    '--from-file', help="Look up the artists in a CSV, NDJSON or plain text "
+    "file, streamed a line at a time.", default=None,
+    type=click.File('r', encoding='utf-8')
+)
+@click.option(
+    '--stdin', 'from_stdin', help="...or on standard input.", is_flag=True,
+    default=False
+)
+@click.option(
+    '--format', 'file_format', help="Format of the --from-file/--stdin "
+    "records (default: by file extension, else NDJSON if the first line is "
+    "an object, else plain text).", type=click.Choice(FORMATS), default=None
+)
+@click.option(
+    '--pool-size', help="Keep-alive connections to keep per host.",
+    default=10, type=int
+)
+@click.option(
+    '--timeout', help="Seconds to wait on each HTTP request.", default=10,
+    type=float
+)
+@click.option(
+    '--workers', help="How many artists to look up at once.", default=1,
+    type=int
+)
+@click.option(
+    '--member-workers', help="How many members of a group to look up at once.",
+    default=4, type=int
+)
+@click.option(
+    '--cache/--no-cache', help="Keep fetched pages in an on-disk cache.",
+    default=True
+)
+@click.option(
+    '--cache-file-path', help="Path to the page cache file.", default=None,
+    type=click.Path()
+)
+@click.option(
+    '--cache-ttl', help="Seconds before a cached page is revalidated.",
+    default=DEFAULT_TTL, type=int
+)
+@click.option(
+    '--cache-size', help="Most megabytes of (compressed) pages to cache.",
+    default=DEFAULT_MAX_BYTES // (1024 * 1024), type=int
+)
+@click.option(
+    '--row-cache-size', help="Artists to keep looked up in memory.",
+    default=DEFAULT_LRU_SIZE, type=int
+)
+@click.option(
+    '--report-file', help="Also write each person found to this file, as "
+    "lines of JSON.", default=None, type=click.Path()
+)
+@click.option(
+    '--purge-misses', help="Forget failed lookups so they're tried again.",
+    is_flag=True, default=False
+)
+@click.option(
+    '--commit-every', help="Commit to the database after this many writes.",
+    default=50, type=int
+)
+@click.option(
+    '--commit-interval', help="...or after this many seconds.", default=5,
+    type=float
+)
+@click.option(
+    '--checkpoint-history/--no-checkpoint-history',
+    help="Also keep a log of offsets, one row per commit.", default=False
+)
+@click.option(
+    '--parser', help="HTML parser to use (default: lxml if installed).",
+    type=click.Choice(['lxml', 'html.parser']), default=None
+)
+@click.option(
+    '--full-parse/--strained-parse',
+    help="Parse whole pages, or just the parts we read.", default=False
+)
+@click.option(
+    '--legacy-context/--clamped-context',
+    help="Keep the old (usually empty) context for a pronoun in a bio's "
+    "first five words, or cut the window short at the start.", default=True
+)
+@click.option(
+    '--classifier', help="Go by the first pronoun in a bio, or score them "
+    "all.", type=click.Choice(['first', 'score']), default='first'
+)
+@click.option(
+    '--min-confidence', help="With --classifier=score, try the next source "
+    "when less sure than this (0-1).", default=0.6, type=float
+)
+@click.option(
+    '--stream/--no-stream', help="Stop downloading a Wikipedia page once "
+    "past its infobox and first paragraph with a pronoun.", default=False
+)
+@click.option(
+    '--stream-max-kb', help="...or after this many KB of it.", default=256
+)
+@click.option(
+    '--stream-max-paragraphs', help="...or after this many paragraphs.",
+    default=20
+)
+@click.option(
+    '--wiki-api/--wiki-html', help="Look artists up on Wikipedia through "
+    "its API (titles checked 50 at a time), or by scraping its pages.",
+    default=False
+)
+@click.option(
+    '--wiki-api-url', help="MediaWiki API endpoint to use with --wiki-api.",
+    default=WIKI_API_URL
+)
+@click.option(
+    '--lastfm-api/--lastfm-html', help="Get Last.FM bios from its API (the "
+    "whole batch up front, needs --lastfm-key), or by scraping its pages.",
+    default=False
+)
+@click.option(
+    '--lastfm-rate', help="Most Last.FM API requests to make a second.",
+    default=LASTFM_API_RATE, type=float
+)
+@click.option(
+    '--retries', help="Times to retry a request that fails or is throttled.",
+    default=4, type=int
+)
+@click.option(
+    '--host-rate', help="Most requests a second to make to a host, as "
+    "HOST=RATE (can be given more than once).", multiple=True,
+    callback=parse_host_rates
+)
+@click.pass_context
+def genderify(ctx, name, offset, forever, search_ahead, playlist_url,
+              from_file, from_stdin, file_format, workers, purge_misses,
+              **options):
     """Get all the artist names."""
+    ctx.obj = {'db_file_path': options['db_file_path']}
+    if ctx.invoked_subcommand is not None:
+        return
+    genderifier_class = Genderifier
+    if options['lastfm_api']:
+        genderifier_class = GenderifierLastFMAPI
+
+    kwargs = get_genderifier_kwargs(ctx.params)
+    with genderifier_class(**kwargs) as genderifier:
+        click.get_current_context().call_on_close(
+            lambda: click.secho(
+                "Row cache: {hits} hits, {misses} misses, {size} of "
+                "{max_size} kept.".format(**genderifier.row_cache_stats),
+                fg="blue"
+            )
+        )
+        if purge_misses:
+            purged = genderifier.purge_misses()
+            click.secho("Forgot {} failed lookups.".format(purged), fg="blue")
 
-    with Genderifier(
-        spotify_token=spotify_token,
-        lastfm_api_key=lastfm_key,
-        batch_limit=batch_limit,
-        db_file_path=db_file_path,
-        force_fetch=force_fetch,
-    ) as genderifier:
         if name:
             genderifier.genderise(
                 genderifier.get_artist_obj_from_name(name)
             )
             return
 
+        if from_file or from_stdin:
+            records = from_file or click.get_text_stream('stdin')
+            genderifier.set_artist_stream_from_import(iter_artists(
+                records, file_format, getattr(from_file, 'name', None)
+            ))
+            genderifier.genderise_batch(workers=workers)
+            return genderifier.get_report()
+
         if playlist_url:
             genderifier.set_artists_batch_from_spotify_public_playlist(
                 url=playlist_url
             )
-            genderifier.genderise_batch()
-            report = genderifier.get_report()
+            genderifier.genderise_batch(workers=workers)
+            report = genderifier.get_playlist_report()
             return report
 
-        try:
-            while forever:
-                genderifier.set_artist_batch_from_spotify_search(offset)
-                genderifier.genderise_batch()
-            else:
-                genderifier.set_artist_batch_from_spotify_search(offset)
-                genderifier.genderise_batch()
-        except RuntimeError as rte:
-            click.secho(str(rte), fg="red")
-        except KeyboardInterrupt:
-            click.secho("You quit!", fg="blue")
-        except SystemExit:
-            click.secho("System exit.", fg="yellow")
+        genderise_search(genderifier, offset, forever, search_ahead, workers)
+
+
+def genderise_search(genderifier, offset, forever, search_ahead, workers):
+    """Genderise Spotify's artist search results, until told to stop."""
+    try:
+        if forever:
+            genderifier.set_artist_stream_from_spotify_search(
+                offset, ahead=search_ahead
+            )
+        else:
+            genderifier.set_artist_batch_from_spotify_search(offset)
+        genderifier.genderise_batch(workers=workers)
+    except RuntimeError as rte:
+        click.secho(str(rte), fg="red")
+    except KeyboardInterrupt:
+        click.secho("You quit!", fg="blue")
+    except SystemExit:
+        click.secho("System exit.", fg="yellow")
+
+
+def get_playlist_id(playlist):
+    """Get a Spotify playlist's ID, from its URL if given that."""
+    if not playlist:
+        return None
+    return playlist.split('?')[0].rstrip('/').rsplit('/', 1)[-1]
+
+
+def write_rows(rows, fields, output_format):
+    """Write out rows (dicts) as JSON or CSV."""
+    if output_format == 'json':
+        click.echo(json.dumps(rows, indent=2))
+        return
+    writer = csv.DictWriter(
+        click.get_text_stream('stdout'), fields, restval='',
+        extrasaction='ignore'
+    )
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+@genderify.command()
+@click.option(
+    '--db-file-path', help="Path to db file (default: as given before "
+    "'report').", default=None, type=click.Path()
+)
+@click.option(
+    '--run', 'run_ids', help="Only report on this run (can be given more "
+    "than once).", multiple=True, type=int
+)
+@click.option(
+    '--playlist', help="Report on a Spotify playlist (ID or URL) as it was "
+    "last looked up, rather than on runs.", default=None
+)
+@click.option(
+    '--list-runs', help="List the runs, rather than report on them.",
+    is_flag=True, default=False
+)
+@click.option(
+    '--format', 'output_format', help="Output format.",
+    type=click.Choice(['json', 'csv']), default='json'
+)
+@click.pass_context
+def report(ctx, db_file_path, run_ids, playlist, list_runs, output_format):
+    """Report on the artists already in the database."""
+    conn = sqlite3.connect(
+        db_file_path or ctx.obj['db_file_path'] or DB_FILE_PATH
+    )
+    try:
+        migrate(conn)
+        curs = conn.cursor()
+        if list_runs:
+            return write_rows(get_runs(curs), RUN_FIELDS, output_format)
+        if playlist and run_ids:
+            raise click.UsageError(
+                "A playlist is reported on as last looked up, not by run."
+            )
+        if playlist:
+            rows = [dict(kind='people', **get_playlist_report(
+                curs, get_playlist_id(playlist)
+            ))]
+        else:
+            ids = get_run_ids(curs, run_ids)
+            rows = [
+                dict(kind='people', **get_db_report(curs, ids)),
+                dict(kind='group members', **get_db_group_report(curs, ids)),
+            ]
+    finally:
+        conn.close()
+    for row in rows:
+        row['unknown_rate'] = get_unknown_rate(row)
+    write_rows(rows, REPORT_FIELDS, output_format)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import pytest
+
+from genderify import gender_finder
+from genderify.gender_finder import BatchProgress, Genderifier
+from genderify.schema import SEARCH_CHECKPOINT
+
+# The order the stand-in lookups finish in; the last one fails. With four
+# workers, artists 6 and 7 are still in flight when it does.
+FINISH_ORDER = [2, 0, 3, 1, 5, 4]
+NAMES = ['Artist {}'.format(number) for number in range(12)]
+
+
+def test_progress_in_order():
+    """Finishing the next artist always advances."""
+    progress = BatchProgress()
+    assert [progress.finish(ix) for ix in range(3)] == [True, True, True]
+    assert progress.done_up_to == 3
+
+
+def test_progress_out_of_order():
+    """Finishing past a gap waits for it, then skips everything done."""
+    progress = BatchProgress()
+    assert not progress.finish(2)
+    assert not progress.finish(1)
+    assert progress.done_up_to == 0
+    assert progress.finish(0)
+    assert progress.done_up_to == 3
+    assert not progress.finish(4)
+    assert progress.done_up_to == 3
+
+
+class StandInLookups(object):
+    """Genderise artists in a set order, failing the last one looked up.
+
+    Each one waits for its turn, which only comes once the one before has
+    been seen finished (by its future). Artists not in the order wait for
+    the executor to shut down.
+    """
+
+    def __init__(self, order):
+        """Setup."""
+        self._turns = list(order)
+        self._failing = order[-1]
+        self._turn_taken = threading.Condition()
+        self.shutting_down = threading.Event()
+
+    def make_executor(self, max_workers):
+        """Make an executor whose futures each take the next turn."""
+        lookups = self
+
+        class Executor(ThreadPoolExecutor):
+            def submit(self, fn, *args, **kwargs):
+                future = super(Executor, self).submit(fn, *args, **kwargs)
+                future.add_done_callback(lambda _: lookups.next_turn())
+                return future
+
+            def shutdown(self, *args, **kwargs):
+                lookups.shutting_down.set()
+                super(Executor, self).shutdown(*args, **kwargs)
+
+        return Executor(max_workers=max_workers)
+
+    def next_turn(self):
+        """Let the next artist in the order finish."""
+        with self._turn_taken:
+            if self._turns:
+                self._turns.pop(0)
+            self._turn_taken.notify_all()
+
+    def genderise(self, artist):
+        """Finish (or fail) on this artist's turn."""
+        ix = NAMES.index(artist.name)
+        if ix not in self._turns:
+            self.shutting_down.wait()
+            return None
+        with self._turn_taken:
+            self._turn_taken.wait_for(lambda: self._turns[0] == ix)
+        if ix == self._failing:
+            raise RuntimeError("Failed on {}".format(artist.name))
+        return 'female'
+
+
+@pytest.fixture
+def genderifier(tmpdir):
+    """A Genderifier with a batch of artists, part of the way into it."""
+    with Genderifier(
+        None,
+        db_file_path=str(tmpdir.join('genderify.db')),
+        use_cache=False,
+    ) as genderifier:
+        genderifier._prefetch = lambda sources, artists: None
+        genderifier._set_batch_source(SEARCH_CHECKPOINT)
+        genderifier._set_offset(100)
+        genderifier._fetched_artists_to_process = [
+            genderifier.get_artist_obj_from_name(name) for name in NAMES
+        ]
+        yield genderifier
+
+
+def test_batch_failing_out_of_order(genderifier, monkeypatch):
+    """The offset stays behind artists still in flight when one fails."""
+    lookups = StandInLookups(FINISH_ORDER)
+    monkeypatch.setattr(
+        gender_finder, 'ThreadPoolExecutor', lookups.make_executor
+    )
+    genderifier.genderise = lookups.genderise
+    with pytest.raises(RuntimeError):
+        genderifier.genderise_batch(workers=4)
+    assert genderifier._get_offset() == 106
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from genderify.gender_finder import Genderifier
+
+SURE = u"Sam Roe is a singer. She was born in Leeds, and she lives there."
+UNSURE = u"Sam Roe is a singer. He and she were born in Leeds; she and he left"
+NO_PRONOUNS = u"Sam Roe is a singer from Leeds."
+
+
+@pytest.fixture
+def genderifier(tmpdir):
+    """A Genderifier that scores pronouns, in bios set per source."""
+    with Genderifier(
+        None,
+        db_file_path=str(tmpdir.join('genderify.db')),
+        use_cache=False,
+        classifier='score',
+        min_confidence=0.6,
+        sources=('wiki', 'lastfm'),
+    ) as genderifier:
+        genderifier.bios = {}
+        genderifier._get_artist_page = lambda source: source
+        genderifier._is_group = lambda source, page: False
+        genderifier._get_bio = lambda source, page: genderifier.bios[page]
+        yield genderifier
+
+
+def genderise(genderifier, wiki, lastfm):
+    """Genderise an artist with these bios, get the gender and any miss."""
+    genderifier.bios = {'wiki': wiki, 'lastfm': lastfm}
+    gender = genderifier.genderise(
+        genderifier.get_artist_obj_from_name(u'Sam Roe')
+    )
+    curs = genderifier._get_db()
+    curs.execute("SELECT reason FROM misses")
+    miss = curs.fetchone()
+    return gender, miss[0] if miss else None
+
+
+def test_sure(genderifier):
+    """The first source sure enough of the gender is the one stored."""
+    assert genderise(genderifier, UNSURE, SURE) == ('female', None)
+
+
+def test_unsure_then_sure(genderifier):
+    """An unsure source moves on to the next one."""
+    assert genderise(genderifier, SURE, UNSURE) == ('female', None)
+
+
+def test_all_unsure(genderifier):
+    """When no source is sure enough, the miss says so."""
+    assert genderise(genderifier, UNSURE, UNSURE) == (None, 'low confidence')
+
+
+def test_no_pronouns(genderifier):
+    """No pronouns at all is an unknown gender, not an unsure one."""
+    assert genderise(genderifier, UNSURE, NO_PRONOUNS) == (
+        None, 'gender unknown'
+    )
+
+
+def test_first_pronoun(genderifier):
+    """Going by the first pronoun, there's no being unsure."""
+    genderifier._classifier = 'first'
+    assert genderise(genderifier, SURE, UNSURE) == ('male', None)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+from functools import cached_property
+import os
+
+from bs4 import Tag
+import pytest
+
+from genderify.parsing import (
+    LASTFM_STRAINER,
+    WIKI_STRAINER,
+    LastFMPage,
+    WikiPage,
+    make_soup,
+)
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), 'pages')
+PAGES = sorted(os.listdir(PAGES_DIR))
+PARSERS = ['html.parser']
+try:
+    import lxml  # noqa
+    PARSERS.append('lxml')
+except ImportError:  # nocov
+    pass
+
+
+def read_page(filename):
+    """Read a saved page."""
+    with open(os.path.join(PAGES_DIR, filename), encoding='utf-8') as page:
+        return page.read()
+
+
+def get_page_class(filename):
+    """Get the page model (and strainer) a saved page is read with."""
+    if filename.startswith('lastfm_'):
+        return LastFMPage, LASTFM_STRAINER
+    return WikiPage, WIKI_STRAINER
+
+
+def plain(value):
+    """Make an attribute's value comparable, soup and all."""
+    if isinstance(value, Tag):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return [plain(item) for item in value]
+    return value
+
+
+def get_attributes(page):
+    """Get every attribute a page model pulls out of its soup."""
+    return {
+        name: plain(getattr(page, name))
+        for name, attribute in vars(type(page)).items()
+        if isinstance(attribute, cached_property)
+    }
+
+
+def parse(filename, parser, strain):
+    """Parse a saved page into its model, as the Genderifier would."""
+    page_class, strainer = get_page_class(filename)
+    return page_class(make_soup(
+        read_page(filename), parser, strainer if strain else None
+    ))
+
+
+@pytest.mark.parametrize('filename', PAGES)
+@pytest.mark.parametrize('parser', PARSERS)
+@pytest.mark.parametrize('strain', [True, False])
+def test_same_attributes_however_parsed(filename, parser, strain):
+    """Every parser, strained or not, pulls the same things out of a page."""
+    expected = get_attributes(parse(filename, 'html.parser', False))
+    assert get_attributes(parse(filename, parser, strain)) == expected
+
+
+@pytest.mark.parametrize('strain', [True, False])
+def test_wiki_page(strain):
+    """The parts of an artist's page we read are there."""
+    page = parse('wiki_person.html', 'html.parser', strain)
+    assert page.infobox_labels == ['Born', 'Genres', 'Labels']
+    assert page.bio.strip().startswith('Jane Doe (born 1970)')
+    assert 'Main page' not in page.text
+    assert ('band', '/wiki/X_(band)') in page.links
+    assert page.members is None
+
+
+@pytest.mark.parametrize('strain', [True, False])
+def test_wiki_members(strain):
+    """A group's members are read from the list in its infobox."""
+    page = parse('wiki_group.html', 'html.parser', strain)
+    assert page.members == [
+        ('Ann A', '/wiki/Ann_A'), ('Bob B', None), ('Cy C', '/wiki/Cy_C')
+    ]
+
+
+@pytest.mark.parametrize('strain', [True, False])
+def test_lastfm_page(strain):
+    """Only the bio and factbox of a Last.FM page are read."""
+    page = parse('lastfm_person.html', 'html.parser', strain)
+    assert page.factbox_labels == ['Years Active', 'Born']
+    assert page.bio.startswith('Sam Roe is a Canadian songwriter.')
+    assert 'Last.fm is a music service' not in page.bio
+    assert page.members is None
+    page = parse('lastfm_group_unlinked.html', 'html.parser', strain)
+    assert page.members == [('Gil G', '/music/Gil+G'), ('Hal H', None)]
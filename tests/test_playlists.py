@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from genderify.gender_finder import Genderifier
+
+PLAYLIST_URL = 'https://open.spotify.com/user/someone/playlist/abc?si=x'
+
+
+class StandInResponse(object):
+    """Just enough of a response."""
+
+    def __init__(self, body):
+        """Setup."""
+        self._body = body
+
+    def json(self):
+        """Get the body."""
+        return self._body
+
+
+class StandInSpotify(object):
+    """Answer playlist requests with the one playlist, as it is now."""
+
+    def __init__(self, snapshot_id, names):
+        """Setup."""
+        self.snapshot_id = snapshot_id
+        self.names = names
+
+    def get(self, url, params=None, **kwargs):
+        """Get the playlist, tracks and all."""
+        return StandInResponse({
+            'snapshot_id': self.snapshot_id,
+            'name': 'A playlist',
+            'description': '',
+            'tracks': {
+                'items': [
+                    {'track': {'artists': [{'name': name, 'id': name}]}}
+                    for name in self.names
+                ],
+                'next': None,
+            },
+        })
+
+
+@pytest.fixture
+def db_file_path(tmpdir):
+    """Where each look up of the playlist is stored."""
+    return str(tmpdir.join('genderify.db'))
+
+
+def look_up_playlist(db_file_path, spotify):
+    """Look up the playlist's artists (all female), return the report."""
+    with Genderifier(
+        None, db_file_path=db_file_path, use_cache=False
+    ) as genderifier:
+        genderifier._get = spotify.get
+        genderifier._genderise_from_sources = lambda: (
+            genderifier.store(
+                genderifier._current_artist_stack[-1], gender='female'
+            ),
+            False,
+            False,
+        )
+        genderifier.set_artists_batch_from_spotify_public_playlist(
+            url=PLAYLIST_URL
+        )
+        genderifier.genderise_batch()
+        report = genderifier.get_playlist_report()
+        curs = genderifier._get_db()
+        curs.execute("SELECT source FROM runs ORDER BY id")
+        return report, [row[0] for row in curs.fetchall()]
+
+
+def test_unchanged_playlist_not_a_run(db_file_path):
+    """Looking up a playlist as it was stored isn't another run of it."""
+    spotify = StandInSpotify('v1', [u'Ann A', u'Bea B'])
+    report, runs = look_up_playlist(db_file_path, spotify)
+    assert report['artists'] == report['female'] == 2
+    assert runs == [u'playlist:abc']
+    assert look_up_playlist(db_file_path, spotify) == (report, runs)
+
+
+def test_changed_playlist_a_run(db_file_path):
+    """...but once it's changed, it is."""
+    spotify = StandInSpotify('v1', [u'Ann A', u'Bea B'])
+    look_up_playlist(db_file_path, spotify)
+    spotify.snapshot_id = 'v2'
+    spotify.names = [u'Bea B', u'Cat C', u'Dee D']
+    report, runs = look_up_playlist(db_file_path, spotify)
+    assert report['artists'] == report['female'] == 3
+    assert runs == [u'playlist:abc', u'playlist:abc']
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+import random
+import re
+
+import pytest
+
+from genderify.pronouns import (
+    PRONOUN_MAP,
+    get_gender_and_context,
+    score_gender,
+)
+
+BIOS = [
+    u"",
+    u"No pronouns here at all.",
+    u"He",
+    u"Jane Doe is a singer. She was born in 1970 in a small town by the sea.",
+    u"Sam (he/him) makes records.",
+    u"Ann A is a singer; s.he and h-e are a band, s/he is not.",
+    u"Bo's songs: \"His\" and 'them' (and they're hers).",
+    u"T'hey formed a band in 1999, after a long time apart from friends.",
+    u"Band\nHe left in 2001 and went on to be a singer of some renown.",
+    u"Two  spaces  apart,  her  band  was  formed  in  a  long  ago  year.",
+    u"A B C D E F G H I she J K L M N O P Q",
+    u"A B C her",
+    u"A B C D E F G H his",
+    u"A B C D him E F G H I",
+    u"İstanbul born İlkay is a DJ. She plays",
+    u"İİİ İİ he İ",
+    u"Ayşe İnce his sister, and a friend of theirs",
+    u"Their İ band",
+    u"ÆTHER, the band; they play",
+]
+
+
+def old_get_gender_and_context(corpus, legacy_context=False):
+    """Find the first pronoun the way it was done a word at a time."""
+    words = corpus.split(' ')
+    for ix, word in enumerate(words):
+        word = re.sub(r'[^\w]', '', word.lower())
+        if word in PRONOUN_MAP:
+            low = ix - 5
+            if low < 0 and not legacy_context:
+                low = 0
+            return PRONOUN_MAP[word], u" ".join(words[low:ix + 5])
+    return None, None
+
+
+def make_bio(rand):
+    """Make up a bio of words, pronouns and punctuation."""
+    pieces = list(PRONOUN_MAP) + [
+        u'a', u'band', u'İ', u'İlkay', u'the', u'theirs', u'hers', u'',
+        u'We', u'\n', u'.', u'-', u"'", u'(', u')', u'ß', u'ǅ',
+    ]
+    words = []
+    for _ in range(rand.randint(0, 20)):
+        word = u''.join(rand.choice(pieces) for _ in range(rand.randint(1, 3)))
+        words.append(word.upper() if rand.random() < 0.2 else word)
+    return u' '.join(words)
+
+
+@pytest.mark.parametrize('legacy_context', [True, False])
+@pytest.mark.parametrize('bio', BIOS)
+def test_same_as_word_split(bio, legacy_context):
+    """The one scan finds what splitting the bio into words did."""
+    assert get_gender_and_context(bio, legacy_context) == \
+        old_get_gender_and_context(bio, legacy_context)
+
+
+@pytest.mark.parametrize('legacy_context', [True, False])
+def test_same_as_word_split_made_up(legacy_context):
+    """...for all sorts of made up bios too."""
+    rand = random.Random(1)
+    for _ in range(2000):
+        bio = make_bio(rand)
+        assert get_gender_and_context(bio, legacy_context) == \
+            old_get_gender_and_context(bio, legacy_context), bio
+
+
+def test_punctuation_inside_words():
+    """A pronoun with punctuation inside it still counts."""
+    assert get_gender_and_context(u"A duo: s.he is one.") == (
+        'female', u"A duo: s.he is one."
+    )
+    assert get_gender_and_context(u"They're not; h-i-m is.")[0] == 'male'
+
+
+def test_first_five_words_legacy():
+    """The old context for a pronoun near the start wraps around."""
+    bio = u"A B she C D E F G H I J K"
+    assert get_gender_and_context(bio, legacy_context=True) == ('female', u"")
+    assert get_gender_and_context(u"A B her", legacy_context=True) == (
+        'female', u"A B her"
+    )
+    assert get_gender_and_context(
+        u"A B C D her E", legacy_context=True
+    ) == ('female', u"E")
+
+
+def test_first_five_words_clamped():
+    """...or is cut short at the start."""
+    bio = u"A B she C D E F G H I J K"
+    assert get_gender_and_context(bio, legacy_context=False) == (
+        'female', u"A B she C D E F"
+    )
+    assert get_gender_and_context(
+        u"A B C D her E", legacy_context=False
+    ) == ('female', u"A B C D her E")
+
+
+def test_lowercasing_changes_length():
+    """Where lower casing grows the bio ('İ'), the context is still right."""
+    bio = u"İİİ İİ İ İ İ İ İ İ İ İ he İ"
+    assert u'İ'.lower() != u'i'
+    assert get_gender_and_context(bio) == (
+        'male', u"İ İ İ İ İ he İ"
+    )
+    assert get_gender_and_context(u"İİ she İ", legacy_context=True) == (
+        'female', u"İİ she İ"
+    )
+
+
+def test_score_weighs_pronouns_by_distance():
+    """A pronoun counts for less the further it is from the artist's name."""
+    bio = u"he A B C D E F G H I J K L M N O P Q R S T Sam she"
+    assert score_gender(bio) == (
+        'male', pytest.approx(1 / (1 + 1 / (1 + 22 / 20.0))),
+        [u"he A B C D"]
+    )
+    gender, confidence, _ = score_gender(bio, u'Sam')
+    assert gender == 'male'
+    assert confidence == pytest.approx(1 / (1 + 1 / (1 + 1 / 20.0)))
+    assert score_gender(bio, u'Sam', near=1000)[1] == pytest.approx(0.5, 0.02)
+
+
+def test_score_father_mentioned_first():
+    """An early 'his' about her father is outweighed by the rest."""
+    bio = (
+        u"Jane Doe (born 1980) is an English singer. Growing up, his records "
+        u"were everywhere: her father was a session drummer and his band "
+        u"toured Europe. Doe released her first album in 2001. She toured "
+        u"with Blur, and she later moved to Berlin, where her second record "
+        u"was made. In 2010 she won a Brit."
+    )
+    assert get_gender_and_context(bio)[0] == 'male'
+    gender, confidence, contexts = score_gender(bio, u'Jane Doe')
+    assert gender == 'female'
+    assert 0.6 < confidence < 0.9
+    assert len(contexts) == 3
+    assert not any(u'his' in context for context in contexts)
+
+
+def test_score_no_pronouns():
+    """With nothing to go on, there's no gender and no confidence."""
+    assert score_gender(u"A band from Leeds.", u'Leeds') == (None, 0.0, [])
+    assert score_gender(u"") == (None, 0.0, [])
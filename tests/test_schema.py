@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+
+import pytest
+
+from genderify.schema import (
+    MIGRATIONS,
+    SEARCH_CHECKPOINT,
+    _create_tables,
+    migrate,
+)
+
+# (id, name, gender, is_group, member_names) as stored before migrations,
+# the same artist under several names being stored again and again.
+ARTISTS = [
+    (1, u'Jane Doe', u'female', 0, None),
+    (2, u'jane  doe', None, 0, None),
+    (3, u'The Foo', None, 1, u'Jane Doe, Bob B'),
+    (4, u'THE FOO', None, 1, u'Ann A, Jane Doe'),
+    (5, u'Sam S', None, 0, None),
+    (6, u'sam s', None, 0, None),
+    (7, u'Ǆemal', u'male', 0, None),
+]
+MISSES = [u'Nobody Here', u'NOBODY HERE', u'Someone']
+OFFSETS = [50, 100, None]
+
+
+@pytest.fixture
+def conn():
+    """A database as it was before there were migrations."""
+    conn = sqlite3.connect(':memory:')
+    curs = conn.cursor()
+    _create_tables(curs)
+    curs.executemany(
+        "INSERT INTO artists(id, name, gender, is_group, member_names) "
+        "VALUES (?, ?, ?, ?, ?)", ARTISTS
+    )
+    curs.executemany(
+        "INSERT INTO misses(name, reason, attempts) "
+        "VALUES (?, 'not found', 1)", [(name,) for name in MISSES]
+    )
+    curs.executemany(
+        "INSERT INTO meta(offset) VALUES (?)",
+        [(offset,) for offset in OFFSETS]
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_migrate(conn):
+    """Each name keeps its best row, and is only stored the once after."""
+    assert migrate(conn) == len(MIGRATIONS)
+    curs = conn.cursor()
+    curs.execute("SELECT id, name_key FROM artists ORDER BY id")
+    assert curs.fetchall() == [
+        (1, u'jane doe'), (4, u'the foo'), (6, u'sam s'), (7, u'džemal')
+    ]
+    curs.execute("SELECT name FROM misses ORDER BY name")
+    assert curs.fetchall() == [(u'nobody here',), (u'someone',)]
+    curs.execute("SELECT source, offset FROM checkpoints")
+    assert curs.fetchall() == [(SEARCH_CHECKPOINT, 100)]
+    curs.execute(
+        "SELECT member_name, member_id, is_lead FROM group_members "
+        "WHERE group_id = 4 ORDER BY position"
+    )
+    assert curs.fetchall() == [(u'Ann A', None, 1), (u'Jane Doe', 1, 0)]
+    curs.execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'artists_name_key'"
+    )
+    assert 'UNIQUE' in curs.fetchone()[0]
+    with pytest.raises(sqlite3.IntegrityError):
+        curs.execute(
+            "INSERT INTO artists(name, name_key) VALUES ('JANE DOE', "
+            "'jane doe')"
+        )
+
+
+def test_migrate_again(conn):
+    """Migrating an up to date database leaves it be."""
+    migrate(conn)
+    dump = list(conn.iterdump())
+    assert migrate(conn) == len(MIGRATIONS)
+    assert list(conn.iterdump()) == dump
+    curs = conn.cursor()
+    curs.execute("SELECT version FROM schema_version ORDER BY version")
+    assert curs.fetchall() == [
+        (number,) for number in range(1, len(MIGRATIONS) + 1)
+    ]
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from genderify.gender_finder import Genderifier, MemberResults
+
+
+@pytest.fixture
+def genderifier(tmpdir):
+    """A Genderifier committing after every write, noting what it commits."""
+    with Genderifier(
+        None,
+        db_file_path=str(tmpdir.join('genderify.db')),
+        use_cache=False,
+        commit_every=1,
+    ) as genderifier:
+        genderifier.committed = []
+        commit = genderifier._commit
+
+        def note_commit():
+            curs = genderifier._conn.cursor()
+            curs.execute(
+                "SELECT name, (SELECT COUNT(*) FROM group_members "
+                "WHERE group_id = artists.id) FROM artists ORDER BY id"
+            )
+            genderifier.committed.append(curs.fetchall())
+            commit()
+
+        genderifier._commit = note_commit
+        yield genderifier
+
+
+def test_group_committed_with_members(genderifier):
+    """A group's row and its members go in the one commit."""
+    members = [
+        genderifier.get_artist_obj_from_name(name)
+        for name in (u'Ann A', u'Bob B')
+    ]
+    genderifier.store(
+        genderifier.get_artist_obj_from_name(u'The Foo'),
+        is_group=True,
+        lead='female',
+        members=MemberResults(0, 1, 1, 0, u'Ann A, Bob B', members),
+    )
+    assert genderifier.committed == [[(u'The Foo', 2)]]
+
+
+def test_person_committed(genderifier):
+    """A person is one write, and one commit."""
+    genderifier.store(
+        genderifier.get_artist_obj_from_name(u'Ann A'), gender='female'
+    )
+    assert genderifier.committed == [[(u'Ann A', 0)]]
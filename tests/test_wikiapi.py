@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+from contextlib import contextmanager
+import json
+import os
+
+import pytest
+
+from genderify.gender_finder import (
+    WIKI_API_MAX_TITLES,
+    Genderifier,
+    WikiTitle,
+)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'wikiapi')
+# The names prefetched for, as one batch.
+NAMES = ['XXXTENTACION', 'the foo', 'Sam S', 'Nobody Here', 'Jane Doe']
+
+
+def load_fixture(filename):
+    """Load a recorded API response."""
+    with open(os.path.join(FIXTURES_DIR, filename), encoding='utf-8') as fp:
+        return json.load(fp)
+
+
+class StandInResponse(object):
+    """Just enough of a response."""
+
+    def __init__(self, body):
+        """Setup."""
+        self._body = body
+
+    def json(self):
+        """Get the body."""
+        return self._body
+
+
+class StandInWiki(object):
+    """Answer API requests from the recorded responses, noting each one."""
+
+    QUERIES = {
+        tuple(sorted(NAMES)): 'query.json',
+        ('Jane Doe (band)',): 'query_band.json',
+    }
+    PAGES = {
+        'XXXTentacion': 'parse_xxxtentacion.json',
+        'The Foo': 'parse_the_foo.json',
+        'Jane Doe': 'parse_jane_doe.json',
+        'Jane Doe (band)': 'parse_jane_doe_band.json',
+    }
+
+    def __init__(self):
+        """Setup."""
+        self.requests = []
+
+    def get(self, url, params=None, **kwargs):
+        """Get the recorded response to a request."""
+        self.requests.append(dict(params))
+        if params['action'] == 'query':
+            titles = tuple(sorted(params['titles'].split('|')))
+            return StandInResponse(load_fixture(self.QUERIES[titles]))
+        return StandInResponse(load_fixture(self.PAGES[params['page']]))
+
+    def get_actions(self):
+        """Get the action and title(s) of each request so far."""
+        return [
+            (params['action'], params.get('titles') or params.get('page'))
+            for params in self.requests
+        ]
+
+
+@pytest.fixture
+def wiki():
+    """A stand-in for the MediaWiki API."""
+    return StandInWiki()
+
+
+@pytest.fixture
+def genderifier(tmpdir, wiki):
+    """A Genderifier that only uses the API, answered by the stand-in."""
+    with Genderifier(
+        None,
+        db_file_path=str(tmpdir.join('genderify.db')),
+        use_cache=False,
+        sources=('wikiapi',),
+    ) as genderifier:
+        genderifier._get = wiki.get
+        genderifier._prefetch(
+            ['wikiapi'],
+            [genderifier.get_artist_obj_from_name(name) for name in NAMES]
+        )
+        yield genderifier
+
+
+@contextmanager
+def looking_up(genderifier, name):
+    """Make the artist with this name the one being looked up."""
+    token = genderifier._push_artist(
+        genderifier.get_artist_obj_from_name(name)
+    )
+    try:
+        yield
+    finally:
+        genderifier._pop_artist(token)
+
+
+def test_read_titles(genderifier):
+    """Each title is followed through normalizing and redirects."""
+    found = genderifier._wikiapi_read_titles(NAMES, load_fixture('query.json'))
+    assert found == {
+        'XXXTENTACION': WikiTitle('XXXTentacion', False, False, False),
+        'the foo': WikiTitle('The Foo', False, False, False),
+        'Sam S': WikiTitle('Sam Smyth (footballer)', True, False, False),
+        'Nobody Here': WikiTitle('Nobody Here', False, True, False),
+        'Jane Doe': WikiTitle('Jane Doe', False, False, True),
+    }
+
+
+def test_batch_looked_up_in_one_query(genderifier, wiki):
+    """Prefetching asks about the whole batch at once."""
+    assert wiki.get_actions() == [('query', '|'.join(NAMES))]
+
+
+def test_missing_title(genderifier, wiki):
+    """A title with no page isn't fetched."""
+    with looking_up(genderifier, 'Nobody Here'):
+        assert genderifier._wikiapi_get_artist_page() is None
+    assert len(wiki.requests) == 1
+
+
+def test_redirect_changing_case(genderifier, wiki):
+    """A redirect that only changes case is the same artist."""
+    with looking_up(genderifier, 'XXXTENTACION'):
+        page = genderifier._wikiapi_get_artist_page()
+        assert genderifier._current_artist_stack[-1].wiki_url == (
+            'https://en.wikipedia.org/wiki/XXXTentacion'
+        )
+    assert page.infobox_labels == ['Genres', 'Labels']
+    assert wiki.get_actions()[1:] == [('parse', 'XXXTentacion')]
+
+
+def test_redirect_changing_case_genderised(genderifier):
+    """...so the artist's gender is found on the page it leads to."""
+    assert genderifier.genderise(
+        genderifier.get_artist_obj_from_name('XXXTENTACION')
+    ) == 'male'
+
+
+def test_normalized_then_redirected(genderifier):
+    """A title normalized, then redirected to another case, is found too."""
+    with looking_up(genderifier, 'the foo'):
+        page = genderifier._wikiapi_get_artist_page()
+    assert genderifier._wikiapi_is_group(page)
+    assert [artist.name for artist in genderifier._wikiapi_get_group_members(
+        page
+    )] == ['Ann A', 'Bob B']
+
+
+def test_redirect_to_other_name(genderifier, wiki):
+    """A redirect to another name probably isn't the artist."""
+    with looking_up(genderifier, 'Sam S'):
+        assert genderifier._wikiapi_get_artist_page() is None
+    assert len(wiki.requests) == 1
+
+
+def test_disambiguation(genderifier, wiki):
+    """A disambiguation page (by its page prop) leads to the one band."""
+    with looking_up(genderifier, 'Jane Doe'):
+        page = genderifier._wikiapi_get_artist_page()
+        assert genderifier._current_artist_stack[-1].wiki_url == (
+            'https://en.wikipedia.org/wiki/Jane_Doe_(band)'
+        )
+    assert 'English band' in genderifier._wikiapi_get_bio(page)
+    assert wiki.get_actions()[1:] == [
+        ('parse', 'Jane Doe'),
+        ('query', 'Jane Doe (band)'),
+        ('parse', 'Jane Doe (band)'),
+    ]
+
+
+def test_titles_chunked(genderifier):
+    """Titles are asked about 50 at a time, and only the once."""
+    requests = []
+
+    def get(url, params=None, **kwargs):
+        requests.append(params['titles'].split('|'))
+        return StandInResponse({'query': {'pages': [
+            {'ns': 0, 'title': title, 'missing': True}
+            for title in requests[-1]
+        ]}})
+
+    genderifier._get = get
+    titles = ['Artist {}'.format(number) for number in range(120)]
+    found = genderifier._wikiapi_get_titles(titles + ['Not|A title'])
+    assert [len(chunk) for chunk in requests] == [
+        WIKI_API_MAX_TITLES, WIKI_API_MAX_TITLES, 20
+    ]
+    assert sum(requests, []) == titles
+    assert len(found) == 121
+    assert all(title.missing for title in found.values())
+    genderifier._wikiapi_get_titles(titles[:60])
+    assert len(requests) == 3